@@ -0,0 +1,153 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Index audit: drives the bench_http scenarios and the remaining list routes
+ through the app, runs EXPLAIN on every distinct SELECT they issued and exits
+ with status 1 when a plan reads a whole table.
+
+ DATABASE_URL=sqlite:///bench.db python -m benchmark.audit_explain
+
+ SQLite plans are read from EXPLAIN QUERY PLAN ("SCAN <table>"), MySQL and
+ MariaDB plans from EXPLAIN (type ALL). Run it on a seeded database, on
+ empty tables the planners have no reason to pick an index.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import random
+import re
+import sys
+
+import httpx
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from benchmark.bench_http import Recorder, Session, SCENARIOS, load_corpus
+
+# Endpoint of the request in flight, the SELECTs it runs are collected under it
+current_endpoint = contextvars.ContextVar("current_endpoint", default=None)
+
+# statement -> {"endpoints": set, "parameters": first parameters seen}
+statements = {}
+
+@event.listens_for(Engine, "before_cursor_execute")
+def collect_statement(connection, cursor, statement, parameters, context, executemany):
+    endpoint = current_endpoint.get()
+    if endpoint is None or executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return
+    entry = statements.setdefault(statement, {"endpoints": set(), "parameters": parameters})
+    entry["endpoints"].add(endpoint)
+
+class AuditSession(Session):
+    """
+    The bench_http client, with every call tagged with its endpoint and the
+    list routes the scenarios leave out: cursor pages, the comment tree and
+    the author's article list.
+    """
+
+    async def call(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response | None:
+        reset = current_endpoint.set(endpoint)
+        try:
+            return await super().call(endpoint, method, path, **kwargs)
+        finally:
+            current_endpoint.reset(reset)
+
+    async def pages(self):
+        article_id, _ = self.rng.choice(self.corpus["articles"])
+        for order in ("articles.id", "articles.created_at"):
+            response = await self.call(f"GET /api/article/list?cursor ({order})", "GET", "/api/article/list", params={"cursor": "", "order_dir": order})
+            if response is not None and response.status_code == 200 and response.json().get("next_cursor"):
+                await self.call(f"GET /api/article/list?cursor ({order})", "GET", "/api/article/list", params={"cursor": response.json()["next_cursor"], "order_dir": order})
+            await self.call(f"GET /api/article/user?cursor ({order})", "GET", "/api/article/user", headers=self.headers, params={"cursor": "", "order_dir": order})
+        await self.call("GET /api/article/user", "GET", "/api/article/user", headers=self.headers)
+        await self.call("GET /api/comment/list/{id} (tree)", "GET", f"/api/comment/list/{article_id}")
+        for route, table in (("/api/account/activity", "activities"), ("/api/notification/list", "notifications")):
+            await self.call(f"GET {route}?cursor ({table}.created_at)", "GET", route, headers=self.headers, params={"cursor": "", "order_dir": f"{table}.created_at"})
+        response = await self.call("GET /api/notification/list", "GET", "/api/notification/list", headers=self.headers)
+        if response is not None and response.status_code == 200 and len(response.json()["data"]) > 0:
+            await self.call("GET /api/notification/read/{id}", "GET", f"/api/notification/read/{response.json()['data'][0]['id']}", headers=self.headers)
+        await self.call("GET /api/auth/confirm/{token}", "GET", f"/api/auth/confirm/{self.rng.getrandbits(128):032x}")
+
+def explain(connection, statement: str, parameters) -> tuple:
+    """
+    Returns (plan lines, tables read in full).
+    """
+    if connection.dialect.name in ("mysql", "mariadb"):
+        rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+        plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}".rstrip() for row in rows]
+        # <derivedN> and <subqueryN> are the optimizer's own temporary tables
+        scans = [row["table"] for row in rows if row["type"] == "ALL" and not str(row["table"]).startswith("<")]
+        return plan, scans
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    plan = [row[3] for row in rows]
+    # Materialized subqueries are scanned by name too, they are not tables.
+    # "SCAN t USING INDEX" still visits every entry of t.
+    derived = {match.group(2) for match in (re.match(r"(MATERIALIZE|CO-ROUTINE) (\w+)", detail) for detail in plan) if match}
+    scans = [match.group(1) for match in (re.match(r"SCAN (\w+)", detail) for detail in plan) if match and match.group(1) not in derived | {"CONSTANT"}]
+    return plan, scans
+
+def bulk_read(statement: str) -> bool:
+    # Reads without WHERE or JOIN want every row, the search index build for
+    # one, no index makes them cheaper
+    return re.search(r"\b(WHERE|JOIN)\b", statement) is None
+
+async def collect(args, corpus: dict):
+    from main import app
+
+    scenarios = {**SCENARIOS, "pages": AuditSession.pages}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://audit", timeout=args.timeout) as http:
+            for name, scenario in scenarios.items():
+                if name in args.skip:
+                    continue
+                session = AuditSession(http, Recorder(), random.Random(f"{args.seed}:{name}"), corpus)
+                for _ in range(args.requests):
+                    await scenario(session)
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the SQL of every router and fail on full table scans")
+    parser.add_argument("--requests", type=int, default=3, help="iterations of each scenario")
+    parser.add_argument("--skip", action="append", default=[], choices=[*SCENARIOS, "pages"], help="repeatable")
+    parser.add_argument("--allow", action="append", default=[], help="table whose full scan is accepted, repeatable")
+    parser.add_argument("--verbose", action="store_true", help="print the plan of every statement")
+    parser.add_argument("--users", type=int, default=1000, help="seeded when the database is empty")
+    parser.add_argument("--articles", type=int, default=10000, help="seeded when the database is empty")
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    from src.database import engine
+    from src.migration import run_migrations
+
+    run_migrations(engine)
+    asyncio.run(collect(args, load_corpus(args)))
+
+    failures = 0
+    with engine.connect() as connection:
+        for statement, entry in statements.items():
+            plan, scans = explain(connection, statement, entry["parameters"])
+            scans = [table for table in scans if table not in args.allow]
+            status = "ok"
+            if len(scans) > 0:
+                status = "bulk read" if bulk_read(statement) else "FULL SCAN " + ", ".join(scans)
+                failures += status.startswith("FULL SCAN")
+            if status.startswith("FULL SCAN") or args.verbose:
+                print(f"{status}  {', '.join(sorted(entry['endpoints']))}")
+                print(f"  {' '.join(statement.split())}")
+                for line in plan:
+                    print(f"    {line}")
+
+    print(f"{len(statements)} statements explained, {failures} with a full table scan")
+    sys.exit(1 if failures > 0 else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Token verification micro-benchmark.
+
+ python -m benchmark.bench_auth --iterations 20000 --requests 2000
+
+ The decode section compares the former per call .env reload and JWT parse
+ with the settings object and verified-token cache. The HTTP section drives
+ /api/account/detail in process, run it on two commits to compare them.
+"""
+
+import argparse
+import os
+import time
+import jwt
+
+from dotenv import load_dotenv
+from src.auth import signJWT, decodeJWT, token_cache
+
+def legacy_decode(token: str) -> dict:
+    load_dotenv()
+    JWT_SECRET = os.getenv("JWT_SECRET_KEY")
+    ALGORITHM = os.getenv("ALGORITHM")
+    decoded_token = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+    return decoded_token if decoded_token["expires"] >= time.time() else None
+
+def rate(callable_, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        callable_()
+    return iterations / (time.perf_counter() - started)
+
+def bench_decode(iterations: int):
+    token = signJWT("benchmark@example.com")["access_token"]
+    token_cache.clear()
+    print(f"legacy decode: {rate(lambda: legacy_decode(token), iterations):,.0f} ops/s")
+    print(f"cached decode: {rate(lambda: decodeJWT(token), iterations):,.0f} ops/s")
+
+def bench_http(requests: int):
+    from fastapi.testclient import TestClient
+    from main import app
+    from src.database import SessionLocal
+    from src.model import User
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).first()
+    finally:
+        db.close()
+    if user == None:
+        print("http: no users, run the seeder first")
+        return
+
+    headers = {"Authorization": f"Bearer {signJWT(user.email)['access_token']}"}
+    with TestClient(app) as client:
+        client.get("/api/account/detail", headers=headers)
+        print(f"/api/account/detail: {rate(lambda: client.get('/api/account/detail', headers=headers), requests):,.0f} req/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Token verification benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=0)
+    args = parser.parse_args()
+    bench_decode(args.iterations)
+    if args.requests > 0:
+        bench_http(args.requests)
+
+if __name__ == "__main__":
+    main()
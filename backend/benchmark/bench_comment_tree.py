@@ -0,0 +1,70 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Comment tree building on a synthetic 10k comment article.
+
+ python -m benchmark.bench_comment_tree --comments 10000
+
+ The former recursive builder is kept here as the baseline, it is quadratic
+ so --skip-legacy is useful above 20k comments.
+"""
+
+import argparse
+import copy
+import random
+import time
+
+from src.view_comment import BuildTree
+
+def legacy_build_tree(elements: list, parent_id: int | None = None):
+    result = []
+    for element in elements:
+        if element["parent_id"] == parent_id:
+            children = legacy_build_tree(elements, element["id"])
+            if len(children) > 0:
+                element["children"] = children
+            else:
+                element["children"] = []
+            result.append(element)
+    return result
+
+def comments(total: int, seed: int, top_level: float = 0.3) -> list:
+    random.seed(seed)
+    result = []
+    for id in range(1, total + 1):
+        parent_id = None if id == 1 or random.random() < top_level else random.randint(1, id - 1)
+        result.append({"id": id, "parent_id": parent_id, "message": "comment", "user": {}})
+    result.reverse()
+    return result
+
+def measure(builder, elements: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        data = copy.deepcopy(elements)
+        started = time.perf_counter()
+        builder(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Comment tree benchmark")
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    elements = comments(args.comments, args.seed)
+    print(f"single pass: {measure(BuildTree, elements, args.repeat):.2f} ms")
+    if not args.skip_legacy:
+        print(f"recursive:   {measure(legacy_build_tree, elements, 1):.2f} ms")
+
+if __name__ == "__main__":
+    main()
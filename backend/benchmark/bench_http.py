@@ -0,0 +1,263 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Scenario benchmark of every router, run in process against the `app` of
+ main.py with concurrent clients.
+
+ DATABASE_URL=sqlite:///bench.db python -m benchmark.bench_http --clients 50 --requests 2000 --output bench.json
+
+ An empty database is seeded first through src.seed (--users, --articles,
+ deterministic under --seed), point DATABASE_URL at a scratch SQLite file
+ or a local MySQL. Every request records its latency and the number of SQL
+ statements it ran; the JSON written to --output is meant to be diffed
+ between commits.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import datetime
+import io
+import json
+import random
+import statistics
+import subprocess
+import time
+
+import httpx
+
+from collections import Counter
+
+from sqlalchemy import event, select, func
+from sqlalchemy.engine import Engine
+from benchmark.bench_load import percentile
+
+# Statement counter of the request in flight. The list is shared with the
+# threadpool and the tasks the request spawns, they run in copies of the
+# client's context.
+statements = contextvars.ContextVar("statements", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_statement(connection, cursor, statement, parameters, context, executemany):
+    counter = statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+class Recorder:
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, endpoint: str, status: int, elapsed: float, sql: int):
+        self.samples.setdefault(endpoint, []).append((status, elapsed, sql))
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = [elapsed for status, elapsed, _ in samples if status < 500]
+            sql = [sql for _, _, sql in samples]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": len(samples) - len(latencies),
+                "statuses": {str(status): count for status, count in sorted(Counter(status for status, _, _ in samples).items())},
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "mean_ms": round(statistics.mean(latencies), 2) if len(latencies) > 0 else 0.0,
+                "sql_mean": round(statistics.mean(sql), 2),
+                "sql_max": max(sql),
+            }
+        return endpoints
+
+class Session:
+    """
+    One simulated client: a user, its token and the requests of a scenario.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder, rng: random.Random, corpus: dict):
+        self.http = http
+        self.recorder = recorder
+        self.rng = rng
+        self.corpus = corpus
+        self.user = rng.choice(corpus["users"])
+        self.headers = {"Authorization": f"Bearer {corpus['tokens'][self.user]}"}
+
+    async def call(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response | None:
+        counter = [0]
+        reset = statements.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 599
+        finally:
+            statements.reset(reset)
+        self.recorder.add(endpoint, status, (time.perf_counter() - started) * 1000, counter[0])
+        return response
+
+    async def login(self):
+        await self.call("POST /api/auth/login", "POST", "/api/auth/login", json={"email": self.user, "password": self.corpus["password"]})
+
+    async def browse(self):
+        page = self.rng.randint(1, self.corpus["pages"])
+        await self.call("GET /api/article/list", "GET", f"/api/article/list?page={page}")
+        choice = self.rng.random()
+        if choice < 0.3:
+            await self.call("GET /api/article/list?search", "GET", "/api/article/list", params={"search": self.rng.choice(self.corpus["words"])})
+        elif choice < 0.5:
+            await self.call("GET /api/article/list?category", "GET", "/api/article/list", params={"category": self.rng.choice(self.corpus["categories"])})
+        else:
+            await self.call("GET /api/article/facets", "GET", "/api/article/facets")
+
+    async def read(self):
+        article_id, slug = self.rng.choice(self.corpus["articles"])
+        response = await self.call("GET /api/article/read/{slug}", "GET", f"/api/article/read/{slug}", headers=self.headers)
+        if response is not None and "etag" in response.headers:
+            await self.call("GET /api/article/read/{slug} (revalidate)", "GET", f"/api/article/read/{slug}", headers={**self.headers, "If-None-Match": response.headers["etag"]})
+
+    async def comments(self):
+        article_id, _ = self.rng.choice(self.corpus["articles"])
+        await self.call("GET /api/comment/list/{id}", "GET", f"/api/comment/list/{article_id}", params={"page": 1})
+        if len(self.corpus["comments"]) > 0:
+            await self.call("GET /api/comment/replies/{id}", "GET", f"/api/comment/replies/{self.rng.choice(self.corpus['comments'])}")
+        if self.rng.random() < 0.2:
+            await self.call("POST /api/comment/create/{id}", "POST", f"/api/comment/create/{article_id}", headers=self.headers, json={"comment": f"benchmark comment {self.rng.random()}"})
+
+    async def account(self):
+        await self.call("GET /api/account/detail", "GET", "/api/account/detail", headers=self.headers)
+        await self.call("GET /api/account/activity", "GET", "/api/account/activity", headers=self.headers)
+        await self.call("GET /api/notification/list", "GET", "/api/notification/list", headers=self.headers)
+
+    async def upload(self):
+        from PIL import Image
+
+        image = io.BytesIO()
+        Image.new("RGB", (640, 480), tuple(self.rng.randrange(256) for _ in range(3))).save(image, "JPEG")
+        response = await self.call("POST /api/account/upload", "POST", "/api/account/upload", headers=self.headers, files={"file_image": ("benchmark.jpg", image.getvalue(), "image/jpeg")})
+        if response is not None and response.status_code == 200:
+            payload = response.json()
+            await self.call("GET /uploads/{file}", "GET", payload["image"])
+            if payload.get("images"):
+                await self.call("GET /api/image/{width}/{file}", "GET", self.rng.choice(list(payload["images"].values())), headers={"Accept": "image/webp"})
+
+SCENARIOS = {
+    "login": Session.login,
+    "browse": Session.browse,
+    "read": Session.read,
+    "comments": Session.comments,
+    "account": Session.account,
+    "upload": Session.upload,
+}
+
+def load_corpus(args) -> dict:
+    from src.auth import signJWT
+    from src.database import SessionLocal
+    from src.model import User, Article, Comment, Category
+    from src.seed import seed_data, PASSWORD
+
+    with SessionLocal() as db:
+        if db.execute(select(func.count(Article.id))).scalar() == 0:
+            seed_data(users=args.users, articles=args.articles, comments=3, viewers=5, notifications=2, seed=args.seed, log=print)
+        rng = random.Random(args.seed)
+        users = [email for (email,) in db.execute(select(User.email).where(User.confirmed == 1).order_by(User.id).limit(args.sample)).all()]
+        articles = [tuple(row) for row in db.execute(select(Article.id, Article.slug).where(Article.status == 1).order_by(Article.id).limit(args.sample)).all()]
+        comments = [id for (id,) in db.execute(select(Comment.id).where(Comment.parent_id == None).order_by(Comment.id).limit(args.sample)).all()]
+        categories = [name for (name,) in db.execute(select(Category.name).order_by(Category.id)).all()]
+        total = db.execute(select(func.count(Article.id)).where(Article.status == 1)).scalar()
+    words = sorted({word.lower() for _, slug in articles for word in slug.split("-") if len(word) > 4 and not word.isdigit()})
+    return {
+        "users": users,
+        "tokens": {email: signJWT(email)["access_token"] for email in users},
+        "password": PASSWORD,
+        "articles": articles,
+        "comments": comments,
+        "categories": categories or [""],
+        "words": rng.sample(words, min(len(words), 50)) or ["article"],
+        "pages": max(1, min(total // 10, 100)),
+    }
+
+async def run_scenario(app, name: str, args, corpus: dict, recorder: Recorder) -> float:
+    transport = httpx.ASGITransport(app=app)
+    remaining = [args.requests]
+
+    async def client(number: int):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as http:
+            session = Session(http, recorder, random.Random(f"{args.seed}:{name}:{number}"), corpus)
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                await SCENARIOS[name](session)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client(number) for number in range(args.clients)])
+    return time.perf_counter() - started
+
+async def run(args) -> dict:
+    from main import app
+
+    corpus = load_corpus(args)
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in args.scenario:
+            recorder = Recorder()
+            elapsed = await run_scenario(app, name, args, corpus, recorder)
+            results[name] = {"elapsed_s": round(elapsed, 3), "endpoints": recorder.report(elapsed)}
+    return results
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP scenario benchmark")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable, defaults to all")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000, help="scenario iterations per scenario")
+    parser.add_argument("--users", type=int, default=1000, help="seeded when the database is empty")
+    parser.add_argument("--articles", type=int, default=10000, help="seeded when the database is empty")
+    parser.add_argument("--sample", type=int, default=500, help="users, articles and comments the clients pick from")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    from src.config import settings
+    from src.database import engine
+    from src.migration import run_migrations
+
+    run_migrations(engine)
+
+    results = asyncio.run(run(args))
+    for name, result in results.items():
+        print(f"{name} ({result['elapsed_s']:.1f} s)")
+        for endpoint, stats in result["endpoints"].items():
+            print(f"  {endpoint:44} {stats['requests']:>6} req {stats['rps']:>8.1f}/s  p50 {stats['p50_ms']:>7.1f}  p95 {stats['p95_ms']:>7.1f}  p99 {stats['p99_ms']:>7.1f} ms  sql {stats['sql_mean']:>5.1f}  errors {stats['errors']}")
+
+    if args.output:
+        document = {
+            "commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "db_async": settings.db_async,
+            "clients": args.clients,
+            "requests": args.requests,
+            "seed": args.seed,
+            "scenarios": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+        print(f"written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Serialization cost of a 100 article /api/article/list page.
+
+ python -m benchmark.bench_json --articles 100 --repeat 2000
+"""
+
+import argparse
+import datetime
+import time
+
+from faker import Faker
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from src.responses import ORJSONResponse
+
+def page(total: int, seed: int) -> dict:
+    fake = Faker()
+    Faker.seed(seed)
+    date_now = datetime.datetime.now()
+    articles = []
+    for id in range(total, 0, -1):
+        articles.append({
+            "id": id,
+            "image": None,
+            "title": fake.sentence(nb_words=6),
+            "slug": fake.slug(),
+            "description": fake.sentence(nb_words=12),
+            "categories": fake.words(2),
+            "tags": fake.words(3),
+            "total_viewer": fake.random_int(0, 10000),
+            "total_comment": fake.random_int(0, 500),
+            "created_at": date_now,
+            "updated_at": date_now,
+            "user": {
+                "image": None,
+                "first_name": fake.first_name(),
+                "last_name": fake.last_name(),
+                "gender": "M"
+            },
+        })
+    return {"total": total * 10, "list": articles, "next_cursor": None}
+
+def measure(render, payload: dict, repeat: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = render(payload)
+    return (time.perf_counter() - started) / repeat * 1000000, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON response benchmark")
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    payload = page(args.articles, args.seed)
+    renders = {
+        "jsonable_encoder + JSONResponse": lambda payload: JSONResponse(content=jsonable_encoder(payload)).body,
+        "ORJSONResponse": lambda payload: ORJSONResponse(content=payload).body,
+    }
+    for name, render in renders.items():
+        elapsed, size = measure(render, payload, args.repeat)
+        print(f"{name:32} {elapsed:9.1f} us  {size} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Latency under concurrent load against a running server.
+
+ DB_ASYNC=false uvicorn main:app --workers 4
+ python -m benchmark.bench_load --clients 500 --requests 20000 --label sync
+ DB_ASYNC=true uvicorn main:app --workers 4
+ python -m benchmark.bench_load --clients 500 --requests 20000 --label async
+
+ The list response cache answers repeated URLs, spread the requests over
+ --pages random pages (or set CACHE_TTL=0) to measure the database path.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+def percentile(values: list, percent: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def client(http: httpx.AsyncClient, paths: list, pages: int, remaining: list, latencies: list, errors: list):
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        path = random.choice(paths)
+        if pages > 1:
+            path += ("&" if "?" in path else "?") + f"page={random.randint(1, pages)}"
+        started = time.perf_counter()
+        try:
+            response = await http.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as error:
+            errors.append(type(error).__name__)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def run(args) -> tuple:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    latencies, errors, remaining = [], [], [args.requests]
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=args.timeout) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*[client(http, args.path, args.pages, remaining, latencies, errors) for _ in range(args.clients)])
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="repeatable, defaults to the article list")
+    parser.add_argument("--token", help="bearer token for authenticated paths")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--label", default="")
+    args = parser.parse_args()
+    args.path = args.path or ["/api/article/list"]
+
+    latencies, errors, elapsed = asyncio.run(run(args))
+    print(f"{args.label or args.url}: {len(latencies)} ok, {len(errors)} errors in {elapsed:.1f} s, {len(latencies) / elapsed:.0f} req/s")
+    if len(latencies) > 0:
+        print(f"  p50 {percentile(latencies, 50):.1f} ms  p90 {percentile(latencies, 90):.1f} ms  p99 {percentile(latencies, 99):.1f} ms  max {max(latencies):.1f} ms  mean {statistics.mean(latencies):.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Bytes and time per /api/article/list page, full entities vs the column
+ projection of src/view_article.py.
+
+ python -m benchmark.bench_projection --articles 10000 --limit 100
+
+ Reuses the corpus of bench_search, point .env (or DATABASE_URL) at a
+ scratch database.
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+from src.database import SessionLocal, engine, Base
+from src.migration import run_migrations
+from src.model import User, Article
+from src.view_article import ARTICLE_LIST_COLUMNS, article_list_items
+from benchmark.bench_search import seed_articles
+
+def entity_query(db):
+    return db.query(Article, User).join(User).filter(Article.status == 1)
+
+def projection_query(db):
+    return db.query(*ARTICLE_LIST_COLUMNS).select_from(Article).join(User, User.id == Article.user_id).filter(Article.status == 1)
+
+def row_bytes(rows: list) -> int:
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, str):
+                total += len(value.encode())
+            elif value is not None:
+                total += 8
+    return total
+
+def measure(db, build, shape, limit: int, pages: int, repeat: int) -> dict:
+    timings = []
+    fetched = []
+    for _ in range(repeat):
+        for page in range(pages):
+            query = build(db).order_by(text("articles.id desc")).limit(limit).offset(page * limit)
+            fetched.append(row_bytes(db.connection().execute(query.statement).all()))
+            db.expunge_all()
+            started = time.perf_counter()
+            shape(query.all())
+            timings.append((time.perf_counter() - started) * 1000)
+            db.expunge_all()
+    return {
+        "bytes_per_page": int(statistics.mean(fetched)),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(statistics.median(timings), 3),
+    }
+
+def entity_items(results: list) -> list:
+    return [{"id": article.id, "title": article.title, "categories": article.categories.split(','), "tags": article.tags.split(','), "user": {"image": user.image, "first_name": user.first_name}} for article, user in results]
+
+def main():
+    parser = argparse.ArgumentParser(description="List projection benchmark")
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        seed_articles(db, args.articles, args.seed)
+        print("entities  ", measure(db, entity_query, entity_items, args.limit, args.pages, args.repeat))
+        print("projection", measure(db, projection_query, article_list_items, args.limit, args.pages, args.repeat))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
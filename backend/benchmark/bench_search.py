@@ -0,0 +1,113 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Compare the legacy ILIKE search with the search engines of src/search.py.
+
+ python -m benchmark.bench_search --articles 100000 --repeat 20
+
+ The corpus is written into the database configured in .env, point it at a
+ scratch database. FULLTEXT is only measured on MySQL/MariaDB.
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+
+from faker import Faker
+from sqlalchemy import func, insert
+from src.database import SessionLocal, engine, Base
+from src.migration import run_migrations
+from src.model import User, Article
+from src.search import LikeSearch, FulltextSearch, InvertedIndexSearch
+
+BENCHMARK_EMAIL = "benchmark.search@example.com"
+
+def seed_articles(db, total: int, seed: int, chunk: int = 1000):
+    current = db.query(func.count(Article.id)).scalar()
+    if current >= total:
+        return
+    user = db.query(User).filter(User.email == BENCHMARK_EMAIL).first()
+    if user == None:
+        user = User(email=BENCHMARK_EMAIL, password="-", confirmed=1)
+        db.add(user)
+        db.commit()
+    fake = Faker()
+    Faker.seed(seed)
+    date_now = datetime.datetime.now()
+    rows = []
+    for number in range(current, total):
+        title = f"{fake.sentence(nb_words=6)} {number}"
+        rows.append({
+            "user_id": user.id,
+            "title": title,
+            "slug": f"benchmark-{number}",
+            "description": fake.sentence(nb_words=12),
+            "content": fake.text(max_nb_chars=2000),
+            "categories": ','.join(fake.words(2)),
+            "tags": ','.join(fake.words(3)),
+            "status": 1,
+            "created_at": date_now,
+            "updated_at": date_now,
+        })
+        if len(rows) == chunk:
+            db.execute(insert(Article), rows)
+            db.commit()
+            rows = []
+    if len(rows) > 0:
+        db.execute(insert(Article), rows)
+        db.commit()
+
+def measure(db, search_engine, terms: list, repeat: int, limit: int = 10) -> dict:
+    timings = []
+    for _ in range(repeat):
+        for term in terms:
+            started = time.perf_counter()
+            data = db.query(Article.id).filter(Article.status == 1)
+            data, rank = search_engine.apply(data, term)
+            data = data.order_by(rank.desc(), Article.id.desc()) if rank is not None else data.order_by(Article.id.desc())
+            data.limit(limit).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Search engine benchmark")
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        seed_articles(db, args.articles, args.seed)
+        terms = Faker().words(20)
+
+        engines = {"like": LikeSearch(), "memory": InvertedIndexSearch()}
+        if engine.dialect.name in ("mysql", "mariadb"):
+            engines["fulltext"] = FulltextSearch()
+
+        started = time.perf_counter()
+        engines["memory"].score(terms[0])
+        print(f"memory index build: {(time.perf_counter() - started):.2f}s")
+
+        for name, search_engine in engines.items():
+            print(name, measure(db, search_engine, terms, args.repeat))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Cold start of a worker: fresh interpreters import main.py, run the
+ lifespan startup and serve a first /api/article/list.
+
+ python -m benchmark.bench_startup --runs 10
+
+ Run `python -m src.cli migrate` against the database first, checkout two
+ commits to compare them.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+def child():
+    import asyncio
+    import httpx
+
+    started = time.perf_counter()
+    from main import app
+    imported = time.perf_counter()
+
+    async def first_response() -> tuple:
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://startup") as http:
+                response = await http.get("/api/article/list")
+            return ready, time.perf_counter(), response.status_code
+
+    ready, served, status = asyncio.run(first_response())
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_response_ms": (served - ready) * 1000,
+        "total_ms": (served - started) * 1000,
+        "status": status,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-m", "benchmark.bench_startup", "--child"], capture_output=True, text=True, check=True, env=os.environ.copy()).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+
+    for key in ("import_ms", "startup_ms", "first_response_ms", "total_ms", "process_ms"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:18} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+    print(f"statuses {sorted({sample['status'] for sample in samples})}")
+
+if __name__ == "__main__":
+    main()
@@ -9,30 +9,8 @@
  * with this source code.
 """
 
-from src.model import *
-from src.database import engine, Base
-from src import database
-from src.view_auth import auth_route
-from src.view_account import account_route
-from src.view_notification import notification_route
-from src.view_article import article_route
-from src.view_comment import comment_route
-from src.seed import Seed
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from pathlib import Path
+from src.app import create_app
 
-Base.metadata.create_all(bind=engine)
-
-seed = Seed()
-seed.run()
-
-Path("uploads").mkdir(parents=True, exist_ok=True)
-
-app = FastAPI()
-app.include_router(auth_route)
-app.include_router(account_route)
-app.include_router(notification_route)
-app.include_router(article_route)
-app.include_router(comment_route)
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
\ No newline at end of file
+# The schema and seed data are no longer created on import, run
+# `python -m src.cli migrate` (and `seed` in development) before serving.
+app = create_app()
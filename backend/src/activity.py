@@ -0,0 +1,183 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from . import database
+from .config import settings
+from .model import Activity
+
+logger = logging.getLogger(__name__)
+
+class ActivityLogger:
+    """
+    Collects activity rows in a bounded queue and writes them from a background
+    thread with one multi-row INSERT per batch. A batch is flushed when it holds
+    `batch_size` rows or `flush_interval` seconds after its first row.
+
+    When the queue is full `policy` decides what happens to a new row: `block`
+    waits for room, `drop` discards it and `spill` appends it to `spill_path`,
+    which is replayed the next time the logger starts. Called from an event
+    loop, the waiting put and the spill file write run in the loop's default
+    executor so a full queue never stalls the other requests.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float, policy: str, spill_path: str):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.spill_path = spill_path
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def log(self, user_id: int, event: str, description: str):
+        date_now = datetime.datetime.now()
+        row = {
+            "user_id": user_id,
+            "event": event,
+            "description": description,
+            "created_at": date_now,
+            "updated_at": date_now,
+        }
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "block":
+            overflow = self._queue.put
+        elif self.policy == "spill":
+            overflow = lambda row: self._spill([row])
+        else:
+            self.dropped += 1
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            overflow(row)
+        else:
+            loop.run_in_executor(None, overflow, row)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="activity-logger", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stop accepting work and drain the queue, anything still queued after
+        `timeout` seconds is spilled to disk.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        rows = self._take(self._queue.qsize())
+        if len(rows) > 0:
+            self._spill(rows)
+
+    def _take(self, limit: int) -> list:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        self._replay()
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            batch += self._take(self.batch_size - len(batch))
+            self._flush(batch)
+
+    def _flush(self, rows: list):
+        try:
+            with database.engine.begin() as connection:
+                connection.execute(Activity.__table__.insert(), rows)
+            self.written += len(rows)
+        except Exception:
+            logger.exception("Unable to write %s activity rows", len(rows))
+            self._spill(rows)
+
+    def _spill(self, rows: list):
+        if not self.spill_path:
+            self.dropped += len(rows)
+            return
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as file:
+                for row in rows:
+                    file.write(json.dumps(row, default=str) + "\n")
+
+    def _replay(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Every worker shares spill_path, the one whose rename succeeds
+        # replays the file and the others find nothing to claim
+        replay_path = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spill_path, replay_path)
+        except OSError:
+            return
+        rows = []
+        with open(replay_path, encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                try:
+                    row = json.loads(line)
+                    row["created_at"] = datetime.datetime.fromisoformat(row["created_at"])
+                    row["updated_at"] = datetime.datetime.fromisoformat(row["updated_at"])
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash
+                    logger.warning("Skipping malformed activity row on line %s of %s", number, replay_path)
+                    continue
+                rows.append(row)
+        for start in range(0, len(rows), self.batch_size):
+            self._flush(rows[start:start + self.batch_size])
+        os.remove(replay_path)
+
+activity_log = ActivityLogger(
+    settings.activity_queue_size,
+    settings.activity_batch_size,
+    settings.activity_flush_interval,
+    settings.activity_policy,
+    settings.activity_spill_path,
+)
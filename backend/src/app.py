@@ -0,0 +1,81 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from contextlib import asynccontextmanager
+from pathlib import Path
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from .config import settings
+from .responses import ORJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from . import database
+    from .activity import activity_log
+    from .tracking import view_tracker
+    from .password import password_hasher
+    from .image import image_derivatives
+    from .upload import upload_cleanup
+    from .metrics import process_exit
+
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    activity_log.start()
+    view_tracker.start()
+    yield
+    view_tracker.close()
+    activity_log.close()
+    password_hasher.close()
+    upload_cleanup.close()
+    image_derivatives.close()
+    await database.dispose_async_engine()
+    process_exit()
+
+def create_app() -> FastAPI:
+    """
+    Build the API. Nothing here touches the database, the schema and seed
+    data are managed by `python -m src.cli migrate` and `python -m src.cli
+    seed`, so booting a worker costs the imports below and the lifespan.
+    Routers are imported here rather than at module level, the CLI and the
+    tools importing src modules do not pay for them.
+    """
+    from .view_auth import auth_route
+    from .view_account import account_route
+    from .view_notification import notification_route
+    from .view_article import article_route, article_async_route
+    from .view_comment import comment_route
+    from .view_image import image_route
+    from .upload import UploadFiles
+
+    Path(settings.upload_dir).mkdir(parents=True, exist_ok=True)
+
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.include_router(auth_route)
+    app.include_router(account_route)
+    app.include_router(notification_route)
+    if settings.db_async:
+        app.include_router(article_async_route)
+    app.include_router(article_route)
+    app.include_router(comment_route)
+    app.include_router(image_route)
+    if settings.metrics_enabled:
+        from .view_metrics import metrics_route
+        app.include_router(metrics_route)
+    app.mount(settings.upload_url, UploadFiles(directory=settings.upload_dir), name="uploads")
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["Server-Timing"])
+    if settings.sql_instrument:
+        from .instrument import SQLInstrumentMiddleware, install
+        install()
+        app.add_middleware(SQLInstrumentMiddleware)
+    if settings.metrics_enabled:
+        from .metrics import MetricsMiddleware
+        app.add_middleware(MetricsMiddleware)
+    return app
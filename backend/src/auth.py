@@ -11,44 +11,39 @@
 
 import time
 import jwt
-import os
 
 from typing import Dict
-from dotenv import load_dotenv
-from .database import get_db
-from .model import User
+from .cache import LRUCache
+from .config import settings
+
+# Verified claims by token, so a request decodes its bearer token at most once
+# and repeated requests with the same token skip the signature check.
+token_cache = LRUCache(settings.token_cache_size, "token")
 
 def token_response(token: str):
     return {
         "access_token": token
-    }  
+    }
 
 def signJWT(UserId: str) -> Dict[str, str]:
-    load_dotenv()
-    JWT_SECRET = os.getenv("JWT_SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
     payload = {
         "UserId": UserId,
         "expires": time.time() + 9000000000
     }
-    token = jwt.encode(payload, JWT_SECRET, algorithm= ALGORITHM)
+    token = jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.algorithm)
     return token_response(token)
 
 
 def decodeJWT(token: str) -> dict:
-    load_dotenv()
-    JWT_SECRET = os.getenv("JWT_SECRET_KEY")
-    ALGORITHM = os.getenv("ALGORITHM")
+    decoded_token = token_cache.get(token)
+    if decoded_token is not None:
+        return decoded_token
     try:
-        decoded_token = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
-        return decoded_token if decoded_token["expires"] >= time.time() else None
+        decoded_token = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.algorithm])
+        remaining = decoded_token["expires"] - time.time()
     except:
         return {}
-    
-def auth_user(token: str) -> dict:
-    db = next(get_db())
-    user_decode = decodeJWT(token)
-    email = user_decode["UserId"]
-    result = db.query(User).filter(User.email == email).first().__dict__
-    result.pop("password")
-    return result
\ No newline at end of file
+    if remaining < 0:
+        return None
+    token_cache.set(token, decoded_token, min(remaining, settings.token_cache_ttl))
+    return decoded_token
\ No newline at end of file
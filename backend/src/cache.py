@@ -0,0 +1,153 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import threading
+import time
+
+from collections import OrderedDict
+from .config import settings
+from .metrics import record_cache
+
+class LRUCache:
+    """
+    In-process cache with per entry expiry and least recently used eviction.
+    A named cache reports its lookups to the metrics.
+    """
+
+    def __init__(self, max_entries: int = 1024, name: str | None = None):
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._versions = {}
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] is not None and item[1] < time.monotonic():
+                del self._data[key]
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+        if self.name is not None:
+            record_cache(self.name, item is not None)
+        return item[0] if item is not None else None
+
+    def set(self, key: str, value, ttl: float | None = None):
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class RedisCache:
+    """
+    Shared backend so every worker process sees the same entries and the same
+    invalidations. Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        return self._client.get(key)
+
+    def set(self, key: str, value, ttl: float | None = None):
+        # Milliseconds, `ex` takes whole seconds and a TTL below one would be
+        # sent as 0, which Redis rejects
+        self._client.set(key, value, px=max(1, round(ttl * 1000)) if ttl is not None else None)
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def version(self, key: str) -> int:
+        return int(self._client.get(key) or 0)
+
+    def bump(self, key: str) -> int:
+        return self._client.incr(key)
+
+    def __len__(self):
+        return self._client.dbsize()
+
+class ResponseCache:
+    """
+    Pre-serialized response bodies of one endpoint. Keys embed a generation
+    number, invalidate() bumps it so every cached page of the endpoint is
+    dropped at once without scanning the backend.
+    """
+
+    def __init__(self, name: str, backend, ttl: float):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts) -> str:
+        generation = self.backend.version(f"{self.name}:generation")
+        return ":".join([self.name, str(generation)] + [str(part) for part in parts])
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        record_cache(self.name, value is not None)
+        return value
+
+    def set(self, key: str, value: bytes):
+        if self.ttl <= 0:
+            return
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self):
+        self.backend.bump(f"{self.name}:generation")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total > 0 else 0.0,
+            "entries": len(self.backend),
+        }
+
+def create_cache_backend():
+    if settings.cache_backend == "redis":
+        return RedisCache(settings.cache_redis_url)
+    return LRUCache(settings.cache_max_entries)
+
+article_list_cache = ResponseCache("article_list", create_cache_backend(), settings.cache_ttl)
+
+caches = [article_list_cache]
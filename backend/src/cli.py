@@ -0,0 +1,44 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ python -m src.cli migrate [--status]
+ python -m src.cli seed --users 100 --articles 0
+"""
+
+import argparse
+
+from . import database
+from .migration import run_migrations, applied_migrations
+from .migrations import MIGRATIONS
+from .seed import add_arguments, run_seed
+
+def migrate(args: argparse.Namespace):
+    if args.status:
+        applied = applied_migrations(database.engine)
+        for migration in MIGRATIONS:
+            print(f"{migration.VERSION} {migration.NAME:24} {'applied' if migration.VERSION in applied else 'pending'}")
+        return
+    versions = run_migrations(database.engine)
+    print(f"applied {', '.join(versions)}" if len(versions) > 0 else "nothing to migrate")
+
+def main():
+    parser = argparse.ArgumentParser(description="Blog backend commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="create the schema and apply pending migrations")
+    migrate_parser.add_argument("--status", action="store_true", help="list the migrations and whether they are applied")
+    migrate_parser.set_defaults(handler=migrate)
+    seed_parser = commands.add_parser("seed", help="insert synthetic users, articles, comments, viewers and notifications")
+    add_arguments(seed_parser)
+    seed_parser.set_defaults(handler=run_seed)
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+class Settings:
+    """
+    Application settings, read from the environment and .env once per process.
+    """
+
+    def __init__(self):
+        load_dotenv()
+        self.app_env = os.getenv("APP_ENV")
+        self.db_host = os.getenv("DB_HOST")
+        self.db_port = os.getenv("DB_PORT")
+        self.db_name = os.getenv("DB_NAME")
+        self.db_username = os.getenv("DB_USERNAME")
+        self.db_password = os.getenv("DB_PASSWORD")
+        self.database_url = os.getenv("DATABASE_URL")
+        self.db_driver = os.getenv("DB_DRIVER", "pymysql")
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", 10))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", 20))
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 30))
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", 1800))
+        self.db_pool_pre_ping = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+        self.db_async = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+        self.db_async_driver = os.getenv("DB_ASYNC_DRIVER", "aiomysql")
+        self.threadpool_size = int(os.getenv("THREADPOOL_SIZE", 40))
+        self.db_echo_pool = os.getenv("DB_ECHO_POOL", "false").lower() in ("1", "true", "yes")
+        self.sql_instrument = os.getenv("SQL_INSTRUMENT", "true").lower() in ("1", "true", "yes")
+        self.sql_slow_query_ms = float(os.getenv("SQL_SLOW_QUERY_MS", 200))
+        self.sql_repeat_threshold = int(os.getenv("SQL_REPEAT_THRESHOLD", 5))
+        self.sql_log_requests = os.getenv("SQL_LOG_REQUESTS", "false").lower() in ("1", "true", "yes")
+        self.metrics_enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.algorithm = os.getenv("ALGORITHM")
+        self.jwt_secret_key = os.getenv("JWT_SECRET_KEY")
+        self.jwt_refresh_secret_key = os.getenv("JWT_REFRESH_SECRET_KEY")
+        self.token_cache_size = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+        self.token_cache_ttl = float(os.getenv("TOKEN_CACHE_TTL", 300))
+        self.user_cache_size = int(os.getenv("USER_CACHE_SIZE", 10000))
+        self.user_cache_ttl = float(os.getenv("USER_CACHE_TTL", 5))
+        self.search_engine = os.getenv("SEARCH_ENGINE", "fulltext")
+        self.search_max_results = int(os.getenv("SEARCH_MAX_RESULTS", 1000))
+        self.cache_backend = os.getenv("CACHE_BACKEND", "memory")
+        self.cache_redis_url = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        self.cache_ttl = float(os.getenv("CACHE_TTL", 30))
+        self.cache_max_entries = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+        self.activity_queue_size = int(os.getenv("ACTIVITY_QUEUE_SIZE", 10000))
+        self.activity_batch_size = int(os.getenv("ACTIVITY_BATCH_SIZE", 500))
+        self.activity_flush_interval = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 1))
+        self.activity_policy = os.getenv("ACTIVITY_POLICY", "spill")
+        self.view_tracker_size = int(os.getenv("VIEW_TRACKER_SIZE", 100000))
+        self.view_flush_interval = float(os.getenv("VIEW_FLUSH_INTERVAL", 5))
+        self.password_hash_rounds = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))
+        self.password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+        self.password_hash_max_pending = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 256))
+        self.upload_dir = os.getenv("UPLOAD_DIR", "uploads").rstrip("/")
+        self.upload_url = "/" + os.getenv("UPLOAD_URL", "/uploads").strip("/")
+        self.upload_max_size = int(os.getenv("UPLOAD_MAX_SIZE", 5 * 1024 * 1024))
+        self.upload_allowed_types = [value.strip() for value in os.getenv("UPLOAD_ALLOWED_TYPES", "png,jpg,gif,webp").split(",")]
+        self.image_widths = [int(value) for value in os.getenv("IMAGE_WIDTHS", "160,480,960").split(",") if value.strip()]
+        self.image_cache_dir = os.getenv("IMAGE_CACHE_DIR", f"{self.upload_dir}/derived").rstrip("/")
+        self.image_cache_max_size = int(os.getenv("IMAGE_CACHE_MAX_SIZE", 512 * 1024 * 1024))
+        self.image_workers = int(os.getenv("IMAGE_WORKERS", 2))
+        self.image_max_pending = int(os.getenv("IMAGE_MAX_PENDING", 64))
+        self.activity_spill_path = os.getenv("ACTIVITY_SPILL_PATH", "activity.spill.jsonl")
+
+settings = Settings()
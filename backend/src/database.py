@@ -9,29 +9,145 @@
  * with this source code.
 """
 
-from sqlalchemy import create_engine
+import logging
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DRIVERS = {
+    "pymysql": "mysql+pymysql",
+    "mysqldb": "mysql+mysqldb",
+    "mysqlclient": "mysql+mysqldb",
+}
 
-load_dotenv()
+def database_url() -> str:
+    if settings.database_url:
+        return settings.database_url
+    driver = DRIVERS.get(settings.db_driver, settings.db_driver)
+    return driver+'://'+settings.db_username+':'+settings.db_password+'@'+settings.db_host+':'+settings.db_port+'/'+settings.db_name
 
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DB_USERNAME = os.getenv("DB_USERNAME")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-URL_DATABASE = 'mysql+pymysql://'+DB_USERNAME+':'+DB_PASSWORD+'@'+DB_HOST+':'+DB_PORT+'/'+DB_NAME
+def engine_options(url: str) -> dict:
+    """
+    Pool options for `create_engine`. SQLite connections are used from the
+    request threads and the background writers (view tracker, activity log),
+    hence check_same_thread=False. An in-memory SQLite database only lives as
+    long as its connection, so it gets a StaticPool: one connection shared by
+    every thread, otherwise each pooled connection would open its own empty
+    database. The sizing options only apply to server databases.
+    """
+    options = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "echo_pool": settings.db_echo_pool,
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory":
+            options["poolclass"] = StaticPool
+        return options
+    options.update({
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    })
+    return options
 
-engine = create_engine(URL_DATABASE)
+URL_DATABASE = database_url()
+
+engine = create_engine(URL_DATABASE, **engine_options(URL_DATABASE))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def pool_stats(target=None) -> dict:
+    pool = (target if target is not None else engine).pool
+    stats = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+def watch_pool(target, interval: float = 60):
+    last_warning = [0.0]
+
+    @event.listens_for(target, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # The pool is past pool_size once overflow turns positive, log it (at
+        # most once per interval) so a saturated pool shows up before requests
+        # start hitting pool_timeout.
+        overflow = getattr(target.pool, "overflow", None)
+        if overflow is not None and overflow() > 0 and time.monotonic() - last_warning[0] > interval:
+            last_warning[0] = time.monotonic()
+            logger.warning("Connection pool is using overflow connections %s", pool_stats(target))
+
+watch_pool(engine)
+
+def async_database_url():
+    url = make_url(URL_DATABASE)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url.set(drivername=f"{url.get_backend_name()}+{settings.db_async_driver}")
+
+_async_engine = None
+_async_session = None
+
+def get_async_engine():
+    """
+    The AsyncEngine behind the async routers, created on first use so the
+    async driver (aiomysql, asyncmy or aiosqlite) is only required when
+    DB_ASYNC is enabled. It keeps its own pool next to the sync engine.
+    """
+    global _async_engine, _async_session
+    if _async_engine is None:
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **engine_options(url))
+        _async_session = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+        watch_pool(_async_engine.sync_engine)
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine, _async_session
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session = None
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session() as db:
+        yield db
+
+@contextmanager
+def unit_of_work(db: Session):
+    """
+    Run the block in a single transaction: one commit on success, rollback on
+    error. Instances are not expired by the commit, so the response can be
+    built from them without reloading.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.expire_on_commit = expire_on_commit
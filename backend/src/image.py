@@ -0,0 +1,172 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+
+from anyio import to_thread
+from .config import settings
+from .workers import BoundedProcessPool
+
+logger = logging.getLogger(__name__)
+
+NAME_PATTERN = re.compile(r"^[\w\-]+\.(png|jpg|jpeg|gif|webp)$")
+
+def derivative_format(name: str, webp: bool) -> str:
+    if webp:
+        return "webp"
+    return "jpg" if name.rsplit(".", 1)[-1] in ("jpg", "jpeg") else "png"
+
+def derivative_path(name: str, width: int, format: str) -> str:
+    return f"{settings.image_cache_dir}/{width}/{name.rsplit('.', 1)[0]}.{format}"
+
+def render(source: str, target: str, width: int, format: str) -> int:
+    """
+    Resize `source` to at most `width` pixels wide into `target` and return
+    the size of the written file. Runs in the worker processes.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((width, width * 3))
+        temp = f"{target}.{os.getpid()}.tmp"
+        if format == "webp":
+            image.save(temp, "WEBP", quality=80, method=4)
+        elif format == "jpg":
+            image.convert("RGB").save(temp, "JPEG", quality=82, optimize=True, progressive=True)
+        else:
+            image.save(temp, "PNG", optimize=True)
+    os.replace(temp, target)
+    return os.path.getsize(target)
+
+class ImageDerivatives:
+    """
+    Resized variants of uploaded images, rendered in a process pool and kept
+    in an on-disk cache. A variant is produced when the image is uploaded or
+    on its first request, a cache hit refreshes the file mtime and the least
+    recently used variants are evicted once the cache exceeds `max_size`.
+    """
+
+    def __init__(self, widths: list, max_size: int, workers: int, max_pending: int):
+        self.widths = widths
+        self.max_size = max_size
+        self.pool = BoundedProcessPool(workers, max_pending, "Too many image requests, please try again later.")
+        self._size = None
+        self._lock = threading.Lock()
+
+    def urls(self, image: str | None) -> dict | None:
+        if not image or len(self.widths) == 0:
+            return None
+        name = os.path.basename(image)
+        return {str(width): f"/api/image/{width}/{name}" for width in self.widths}
+
+    def source(self, name: str) -> str | None:
+        path = f"{settings.upload_dir}/{name}"
+        if NAME_PATTERN.match(name) is None or not os.path.isfile(path):
+            return None
+        return path
+
+    async def get(self, name: str, width: int, webp: bool) -> str | None:
+        """
+        Path of the `width` variant of the upload `name`, rendered on a cache
+        miss. None when there is no such upload, an upload Pillow can not
+        decode raises OSError.
+        """
+        source = self.source(name)
+        if source is None:
+            return None
+        format = derivative_format(name, webp)
+        target = derivative_path(name, width, format)
+        if os.path.exists(target):
+            os.utime(target)
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        size = await asyncio.wrap_future(self.pool.submit(render, source, target, width, format))
+        await to_thread.run_sync(self._added, size, target)
+        return target
+
+    def warm(self, image: str | None):
+        """
+        Background task after an upload: render the WebP variants up front so
+        the first feed render does not wait for them.
+        """
+        name = os.path.basename(image) if image else ""
+        source = self.source(name)
+        if source is None:
+            return
+        for width in self.widths:
+            target = derivative_path(name, width, "webp")
+            if os.path.exists(target):
+                continue
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                self._added(self.pool.submit(render, source, target, width, "webp").result(), target)
+            except Exception as error:
+                logger.warning("Unable to render %s at %spx: %s", name, width, error)
+                return
+
+    def remove(self, image: str):
+        name = os.path.basename(image)
+        for width in self.widths:
+            for format in ("webp", "jpg", "png"):
+                path = derivative_path(name, width, format)
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    self._added(-size)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        self.pool.close()
+
+    def _files(self) -> list:
+        files = []
+        for root, _, names in os.walk(settings.image_cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, path, stat.st_size))
+        return files
+
+    def _added(self, size: int, keep: str | None = None):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, _, size in self._files())
+            else:
+                self._size += size
+            if self._size <= self.max_size:
+                return
+            # Evict down to 90% so a full cache is not rescanned on every render
+            for _, path, size in sorted(self._files()):
+                if self._size <= self.max_size * 0.9:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    self._size -= size
+                except FileNotFoundError:
+                    pass
+
+image_derivatives = ImageDerivatives(
+    settings.image_widths,
+    settings.image_cache_max_size,
+    settings.image_workers,
+    settings.image_max_pending,
+)
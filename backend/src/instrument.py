@@ -0,0 +1,124 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import contextvars
+import json
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class RequestQueries:
+    """
+    SQL executed while serving one request. Rows are what the driver reports
+    in `cursor.rowcount`, affected rows for writes and, with the buffered
+    MySQL cursors, fetched rows for reads.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.executions = {}
+
+    def add(self, statement: str, elapsed: float, rows: int):
+        self.statements += 1
+        self.duration += elapsed
+        self.rows += max(rows, 0)
+        self.executions[statement] = self.executions.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> list:
+        return [(statement, count) for statement, count in self.executions.items() if count >= threshold]
+
+    def server_timing(self, elapsed: float) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.statements} queries, {self.rows} rows", app;dur={elapsed * 1000:.2f}'
+
+current_queries = contextvars.ContextVar("current_queries", default=None)
+
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._instrument_started = time.perf_counter()
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_instrument_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if settings.sql_slow_query_ms > 0 and elapsed * 1000 >= settings.sql_slow_query_ms:
+        # Parameters are left out, they carry e-mails, tokens and hashes
+        logger.warning("Slow query %.1f ms: %s", elapsed * 1000, " ".join(statement.split()))
+    queries = current_queries.get()
+    if queries is not None:
+        queries.add(statement, elapsed, cursor.rowcount)
+
+def install():
+    """
+    Time every statement of every engine, the async engine included through
+    its sync_engine. Safe to call more than once.
+    """
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+class SQLInstrumentMiddleware:
+    """
+    Collects the SQL of each HTTP request, sends the totals as a Server-Timing
+    header and logs statements repeated `sql_repeat_threshold` times or more
+    in one request, the usual shape of an N+1. Plain ASGI rather than
+    BaseHTTPMiddleware so the context variable reaches the threadpool and
+    streaming responses are left alone.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        reset = current_queries.set(queries)
+        started = time.perf_counter()
+        status = [None]
+
+        async def send_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", queries.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timing)
+        finally:
+            current_queries.reset(reset)
+            # Background tasks have run by now, their SQL counts in the log
+            # but not in the header
+            self.report(scope, status[0], queries, time.perf_counter() - started)
+
+    def report(self, scope, status: int | None, queries: RequestQueries, elapsed: float):
+        for statement, count in queries.repeated(settings.sql_repeat_threshold):
+            logger.warning("Possible N+1 in %s %s: %s executions of %s", scope["method"], scope["path"], count, " ".join(statement.split()))
+        if settings.sql_log_requests:
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_ms": round(queries.duration * 1000, 2),
+                "statements": queries.statements,
+                "rows": queries.rows,
+            }))
@@ -0,0 +1,98 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import os
+import time
+
+# config loads .env first, prometheus_client reads PROMETHEUS_MULTIPROC_DIR
+# when it is imported
+from .config import settings
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter("http_requests_total", "HTTP requests served", ["method", "route", "status"])
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served", multiprocess_mode="livesum")
+DB_POOL = Gauge("db_pool_connections", "Connections of the database.engine pool", ["state"], multiprocess_mode="livesum")
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash and verify time, queueing for a hasher process included",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5),
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups, hit ratio is hit / (hit + miss)", ["cache", "result"])
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+def record_pool():
+    # Imported here, database.py is not needed by the modules that only count
+    from .database import engine, pool_stats
+
+    stats = pool_stats(engine)
+    DB_POOL.labels("checked_out").set(stats.get("checkedout", 0))
+    DB_POOL.labels("checked_in").set(stats.get("checkedin", 0))
+    # QueuePool counts overflow from -pool_size up, only positive values are real connections
+    DB_POOL.labels("overflow").set(max(stats.get("overflow", 0), 0))
+
+def route_name(scope) -> str:
+    # The route template keeps the label set bounded, unmatched paths share one label
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+def latest() -> bytes:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def process_exit():
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+class MetricsMiddleware:
+    """
+    Request count, latency and in-flight gauge per route template, and the
+    pool gauges of this worker refreshed after every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+        started = time.perf_counter()
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            IN_PROGRESS.dec()
+            route = route_name(scope)
+            REQUESTS.labels(scope["method"], route, str(status[0])).inc()
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            record_pool()
@@ -0,0 +1,52 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import datetime
+
+from sqlalchemy import Table, Column, String, DateTime, MetaData, select
+from sqlalchemy.engine import Engine
+from .migrations import MIGRATIONS
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations',
+    metadata,
+    Column('version', String(32), primary_key=True),
+    Column('name', String(191), nullable=False),
+    Column('applied_at', DateTime, default=datetime.datetime.utcnow),
+)
+
+def applied_migrations(engine: Engine) -> set:
+    metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+def run_migrations(engine: Engine) -> list:
+    applied = applied_migrations(engine)
+    result = []
+    for migration in MIGRATIONS:
+        if migration.VERSION in applied:
+            continue
+        if getattr(migration, "BATCHED", False):
+            # The migration commits its own batches, the version is recorded
+            # once all of them are in and a failed run resumes from the start
+            with engine.connect() as connection:
+                migration.upgrade(connection)
+                connection.commit()
+            with engine.begin() as connection:
+                connection.execute(schema_migrations.insert().values(version=migration.VERSION, name=migration.NAME))
+        else:
+            with engine.begin() as connection:
+                migration.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(version=migration.VERSION, name=migration.NAME))
+        result.append(migration.VERSION)
+    return result
@@ -0,0 +1,33 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from . import v0000_base_schema
+from . import v0001_article_fulltext
+from . import v0002_viewer_unique
+from . import v0003_article_terms
+from . import v0004_query_indexes
+from . import v0005_upload_names
+from . import v0006_term_names
+
+# Applied in order by `python -m src.cli migrate`, each module exposes VERSION,
+# NAME and upgrade(connection). The upgrade runs in one transaction unless the
+# module sets BATCHED = True, it then commits its own batches on the
+# connection. Every later upgrade must be idempotent because v0000 gives a
+# fresh database the latest schema of src.model.
+MIGRATIONS = [
+    v0000_base_schema,
+    v0001_article_fulltext,
+    v0002_viewer_unique,
+    v0003_article_terms,
+    v0004_query_indexes,
+    v0005_upload_names,
+    v0006_term_names,
+]
@@ -0,0 +1,21 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from ..database import Base
+from .. import model  # registers the tables on Base.metadata
+
+VERSION = "0000"
+NAME = "base_schema"
+
+def upgrade(connection):
+    # Creates whatever tables of src.model are missing, a no-op on databases
+    # that were set up by the former create_all on boot.
+    Base.metadata.create_all(bind=connection)
@@ -0,0 +1,22 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from sqlalchemy import inspect, text
+
+VERSION = "0001"
+NAME = "article_fulltext"
+
+def upgrade(connection):
+    if connection.dialect.name not in ("mysql", "mariadb"):
+        return
+    indexes = [index["name"] for index in inspect(connection).get_indexes("articles")]
+    if "ft_articles_search" not in indexes:
+        connection.execute(text("ALTER TABLE articles ADD FULLTEXT INDEX ft_articles_search (title, description, content, categories, tags)"))
@@ -0,0 +1,29 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from sqlalchemy import inspect, text
+from ..model import Viewer
+
+VERSION = "0002"
+NAME = "viewer_unique"
+
+def upgrade(connection):
+    indexes = [index["name"] for index in inspect(connection).get_indexes("viewers")]
+    if "uq_viewers_article_user" in indexes:
+        return
+    # Keep the first view of every (article, user) pair before adding the unique index
+    if connection.dialect.name in ("mysql", "mariadb"):
+        connection.execute(text("DELETE v1 FROM viewers v1 JOIN viewers v2 ON v1.article_id = v2.article_id AND v1.user_id = v2.user_id AND v1.id > v2.id"))
+    else:
+        connection.execute(text("DELETE FROM viewers WHERE id NOT IN (SELECT MIN(id) FROM viewers GROUP BY article_id, user_id)"))
+    for index in Viewer.__table__.indexes:
+        if index.name == "uq_viewers_article_user":
+            index.create(bind=connection)
@@ -0,0 +1,39 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from sqlalchemy import select
+from ..model import Article
+from ..taxonomy import link_terms, refresh_facets
+
+VERSION = "0003"
+NAME = "article_terms"
+BATCHED = True
+
+BATCH_SIZE = 1000
+
+def upgrade(connection):
+    # Convert the comma separated categories and tags into the link tables in
+    # id batches committed one by one, link_terms only adds what is missing so
+    # a rerun after a failure is harmless.
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Article.id, Article.categories, Article.tags)
+            .where(Article.id > last_id)
+            .order_by(Article.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if len(rows) == 0:
+            break
+        link_terms(connection, {row.id: {"category": row.categories, "tag": row.tags} for row in rows})
+        connection.commit()
+        last_id = rows[-1].id
+    refresh_facets(connection)
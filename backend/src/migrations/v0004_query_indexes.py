@@ -0,0 +1,69 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from sqlalchemy import inspect, text
+from ..model import Article, Activity, Comment, Notification
+
+VERSION = "0004"
+NAME = "query_indexes"
+
+# Single column indexes no query uses: duplicates of the primary keys,
+# profile and social columns, timestamps and low cardinality flags. Every
+# write to these tables paid for them.
+DROPPED = {
+    "users": [
+        "ix_users_id", "ix_users_password", "ix_users_first_name", "ix_users_last_name", "ix_users_gender",
+        "ix_users_job_title", "ix_users_country", "ix_users_instagram", "ix_users_facebook", "ix_users_twitter",
+        "ix_users_linked_in", "ix_users_reset_token", "ix_users_confirmed", "ix_users_created_at", "ix_users_updated_at",
+    ],
+    "activities": ["ix_activities_id", "ix_activities_event", "ix_activities_description", "ix_activities_created_at", "ix_activities_updated_at"],
+    "articles": [
+        "ix_articles_id", "ix_articles_description", "ix_articles_total_viewer", "ix_articles_total_comment",
+        "ix_articles_status", "ix_articles_created_at", "ix_articles_updated_at",
+    ],
+    "categories": ["ix_categories_id", "ix_categories_created_at", "ix_categories_updated_at"],
+    "tags": ["ix_tags_id", "ix_tags_created_at", "ix_tags_updated_at"],
+    "article_facets": ["ix_article_facets_id"],
+    "comments": ["ix_comments_id", "ix_comments_created_at", "ix_comments_updated_at"],
+    "notifications": [
+        "ix_notifications_id", "ix_notifications_subject", "ix_notifications_message",
+        "ix_notifications_created_at", "ix_notifications_updated_at",
+    ],
+    "viewers": ["ix_viewers_id", "ix_viewers_status", "ix_viewers_created_at", "ix_viewers_updated_at"],
+}
+
+# (filter, sort) indexes of the list pages, see the __table_args__ in src.model
+ADDED = {
+    Activity: ["ix_activities_user_id_id", "ix_activities_user_id_created_at"],
+    Article: ["ix_articles_status_id", "ix_articles_status_created_at", "ix_articles_user_id_id"],
+    Comment: ["ix_comments_article_id_id", "ix_comments_parent_id_id"],
+    Notification: ["ix_notifications_user_id_id", "ix_notifications_user_id_created_at"],
+}
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    # Composite indexes first, the list pages keep an index while the old
+    # ones are dropped
+    for model, names in ADDED.items():
+        existing = [index["name"] for index in inspector.get_indexes(model.__tablename__)]
+        for index in model.__table__.indexes:
+            if index.name in names and index.name not in existing:
+                index.create(bind=connection)
+    for table, names in DROPPED.items():
+        existing = [index["name"] for index in inspector.get_indexes(table)]
+        for name in names:
+            if name not in existing:
+                continue
+            if connection.dialect.name in ("mysql", "mariadb"):
+                connection.execute(text(f"DROP INDEX {quote(name)} ON {quote(table)}"))
+            else:
+                connection.execute(text(f"DROP INDEX {quote(name)}"))
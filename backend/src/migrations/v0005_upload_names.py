@@ -0,0 +1,26 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import posixpath
+
+from sqlalchemy import select, update
+from ..model import Article, User
+
+VERSION = "0005"
+NAME = "upload_names"
+
+def upgrade(connection):
+    # `image` used to hold the file path under UPLOAD_DIR ("uploads/<name>"),
+    # keep the file name only, the URL is built from UPLOAD_URL
+    for model in (User, Article):
+        paths = connection.execute(select(model.image).where(model.image.like("%/%")).distinct()).scalars().all()
+        for path in paths:
+            connection.execute(update(model).where(model.image == path).values(image=posixpath.basename(path)))
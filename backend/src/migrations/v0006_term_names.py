@@ -0,0 +1,42 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from sqlalchemy import select, update, delete
+from ..taxonomy import FACETS, normalize_term, refresh_facets
+
+VERSION = "0006"
+NAME = "term_names"
+
+def upgrade(connection):
+    # Terms are stored trimmed and lower cased now. Names that only differ in
+    # case or spaces (possible on SQLite's binary collation) are merged into
+    # the oldest term: its links are extended with the articles of the
+    # others, which are then removed, before the survivor is renamed.
+    changed = False
+    for facet, (term, link, column) in FACETS.items():
+        groups = {}
+        for id, name in connection.execute(select(term.id, term.name).order_by(term.id)).all():
+            groups.setdefault(normalize_term(name), []).append((id, name))
+        for normalized, terms in groups.items():
+            (keep, name), duplicates = terms[0], [id for id, _ in terms[1:]]
+            if len(duplicates) == 0 and name == normalized:
+                continue
+            changed = True
+            if len(duplicates) > 0:
+                linked = set(connection.execute(select(link.article_id).where(column == keep)).scalars().all())
+                merged = set(connection.execute(select(link.article_id).where(column.in_(duplicates))).scalars().all()) - linked
+                if len(merged) > 0:
+                    connection.execute(link.__table__.insert(), [{"article_id": article_id, column.key: keep} for article_id in merged])
+                connection.execute(delete(link).where(column.in_(duplicates)))
+                connection.execute(delete(term).where(term.id.in_(duplicates)))
+            connection.execute(update(term).where(term.id == keep).values(name=normalized))
+    if changed:
+        refresh_facets(connection)
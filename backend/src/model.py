@@ -9,37 +9,48 @@
  * with this source code.
 """
 
-from sqlalchemy import Column, ForeignKey, String, DateTime,  Text
+from sqlalchemy import Column, ForeignKey, String, DateTime,  Text, Index, Integer, SmallInteger
 from sqlalchemy.dialects.mysql import  BIGINT, TINYINT, LONGTEXT, INTEGER
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
 
+# MySQL column types, with SQLite variants so the schema can also be created
+# on SQLite (an INTEGER primary key is the SQLite rowid alias).
+BIGINT_UNSIGNED = BIGINT(unsigned=True).with_variant(Integer(), "sqlite")
+TINYINT_UNSIGNED = TINYINT(unsigned=True).with_variant(SmallInteger(), "sqlite")
+INTEGER_UNSIGNED = INTEGER(unsigned=True).with_variant(Integer(), "sqlite")
+LONG_TEXT = LONGTEXT().with_variant(Text(), "sqlite")
+
+# Only the columns the routers look up or order by are indexed, composite
+# (filter, sort) indexes serve the list pages. Check the plans with
+# benchmark/audit_explain.py after changing a query or an index.
+
 class User(Base):
     __tablename__ = 'users'
     __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
     email = Column(String(180), index=True, nullable=False, unique=True)
     phone = Column(String(64), index=True, nullable=True, unique=True)
-    password = Column(String(255), index=True, nullable=False, unique=False)
+    password = Column(String(255), nullable=False, unique=False)
     image = Column(String(255), index=True, nullable=True, unique=False)
-    first_name = Column(String(191), index=True, nullable=True, unique=False)
-    last_name = Column(String(191), index=True, nullable=True, unique=False)
-    gender = Column(String(2), index=True, nullable=True, unique=False)
-    job_title = Column(String(191), index=True, nullable=True, unique=False)
-    country = Column(String(191), index=True, nullable=True, unique=False)
-    instagram = Column(String(255), index=True, nullable=True)
-    facebook = Column(String(255), index=True, nullable=True)
-    twitter = Column(String(255), index=True, nullable=True)
-    linked_in = Column(String(255), index=True, nullable=True)
+    first_name = Column(String(191), nullable=True, unique=False)
+    last_name = Column(String(191), nullable=True, unique=False)
+    gender = Column(String(2), nullable=True, unique=False)
+    job_title = Column(String(191), nullable=True, unique=False)
+    country = Column(String(191), nullable=True, unique=False)
+    instagram = Column(String(255), nullable=True)
+    facebook = Column(String(255), nullable=True)
+    twitter = Column(String(255), nullable=True)
+    linked_in = Column(String(255), nullable=True)
     address = Column(Text(), nullable=True)
     about_me = Column(Text(), nullable=True)
-    reset_token = Column(String(36), index=True, nullable=True)
+    reset_token = Column(String(36), nullable=True)
     confirm_token = Column(String(36), index=True, nullable=True)
-    confirmed = Column(TINYINT(unsigned=True), index=True, default=0)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    confirmed = Column(TINYINT_UNSIGNED, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     activities = relationship("Activity", back_populates="user")
     articles = relationship("Article", back_populates="user")
     comments = relationship("Comment", back_populates="user")
@@ -48,74 +59,148 @@ class User(Base):
     
 class Activity(Base):
     __tablename__ = 'activities'
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('ix_activities_user_id_id', 'user_id', 'id'),
+        Index('ix_activities_user_id_created_at', 'user_id', 'created_at'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
-    user_id = Column(BIGINT(unsigned=True), ForeignKey('users.id'))
-    event = Column(String(191), index=True, nullable=False, unique=False)
-    description = Column(String(255), index=True, nullable=False, unique=False)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    user_id = Column(BIGINT_UNSIGNED, ForeignKey('users.id'))
+    event = Column(String(191), nullable=False, unique=False)
+    description = Column(String(255), nullable=False, unique=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     user = relationship("User", back_populates="activities")
     
 class Article(Base):
     __tablename__ = 'articles'
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('ft_articles_search', 'title', 'description', 'content', 'categories', 'tags', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+        Index('ix_articles_status_id', 'status', 'id'),
+        Index('ix_articles_status_created_at', 'status', 'created_at'),
+        Index('ix_articles_user_id_id', 'user_id', 'id'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
-    user_id = Column(BIGINT(unsigned=True), ForeignKey('users.id'))
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    user_id = Column(BIGINT_UNSIGNED, ForeignKey('users.id'))
     image = Column(String(255), index=True, nullable=True, unique=False)
     title = Column(String(255), index=True, nullable=False, unique=True)
     slug = Column(String(255), index=True, nullable=False, unique=True)
-    description = Column(String(255), index=True, nullable=False, unique=False)
-    content = Column(LONGTEXT(), nullable=False)
-    categories = Column(LONGTEXT(), nullable=True)
-    tags = Column(LONGTEXT(), nullable=True)
-    total_viewer = Column(INTEGER(unsigned=True), index=True, default=0)
-    total_comment = Column(INTEGER(unsigned=True), index=True, default=0)
-    status = Column(TINYINT(unsigned=True), index=True, default=0)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    description = Column(String(255), nullable=False, unique=False)
+    content = Column(LONG_TEXT, nullable=False)
+    categories = Column(LONG_TEXT, nullable=True)
+    tags = Column(LONG_TEXT, nullable=True)
+    total_viewer = Column(INTEGER_UNSIGNED, default=0)
+    total_comment = Column(INTEGER_UNSIGNED, default=0)
+    status = Column(TINYINT_UNSIGNED, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     user = relationship("User", back_populates="articles")
     viewers = relationship("Viewer", back_populates="article")
     comments = relationship("Comment", back_populates="article")
     
+class Category(Base):
+    __tablename__ = 'categories'
+    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    name = Column(String(191), index=True, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+class Tag(Base):
+    __tablename__ = 'tags'
+    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    name = Column(String(191), index=True, nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+class ArticleCategory(Base):
+    __tablename__ = 'article_categories'
+    __table_args__ = (
+        Index('ix_article_categories_category_article', 'category_id', 'article_id'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
+    
+    article_id = Column(BIGINT_UNSIGNED, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    category_id = Column(BIGINT_UNSIGNED, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    
+class ArticleTag(Base):
+    __tablename__ = 'article_tags'
+    __table_args__ = (
+        Index('ix_article_tags_tag_article', 'tag_id', 'article_id'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
+    
+    article_id = Column(BIGINT_UNSIGNED, ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    tag_id = Column(BIGINT_UNSIGNED, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    
+class ArticleFacet(Base):
+    __tablename__ = 'article_facets'
+    __table_args__ = (
+        Index('uq_article_facets_facet_term', 'facet', 'term_id', unique=True),
+        Index('ix_article_facets_facet_total', 'facet', 'total'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
+    
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    facet = Column(String(16), nullable=False)
+    term_id = Column(BIGINT_UNSIGNED, nullable=False)
+    name = Column(String(191), nullable=False)
+    total = Column(INTEGER_UNSIGNED, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
 class Comment(Base):
     __tablename__ = 'comments'
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('ix_comments_article_id_id', 'article_id', 'id'),
+        Index('ix_comments_parent_id_id', 'parent_id', 'id'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
-    parent_id = Column(BIGINT(unsigned=True), ForeignKey('comments.id'), nullable=True)
-    article_id = Column(BIGINT(unsigned=True), ForeignKey('articles.id'))
-    user_id = Column(BIGINT(unsigned=True), ForeignKey('users.id'))
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    parent_id = Column(BIGINT_UNSIGNED, ForeignKey('comments.id'), nullable=True)
+    article_id = Column(BIGINT_UNSIGNED, ForeignKey('articles.id'))
+    user_id = Column(BIGINT_UNSIGNED, ForeignKey('users.id'))
     message = Column(Text(), nullable=True)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     article = relationship("Article", back_populates="comments")
     user = relationship("User", back_populates="comments")
     parent = relationship("Comment", backref='comments',remote_side=[id])
     
 class Notification(Base):
     __tablename__ = 'notifications'
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('ix_notifications_user_id_id', 'user_id', 'id'),
+        Index('ix_notifications_user_id_created_at', 'user_id', 'created_at'),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
-    user_id = Column(BIGINT(unsigned=True), ForeignKey('users.id'))
-    subject = Column(String(191), index=True, nullable=False, unique=False)
-    message = Column(String(255), index=True, nullable=False, unique=False)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    user_id = Column(BIGINT_UNSIGNED, ForeignKey('users.id'))
+    subject = Column(String(191), nullable=False, unique=False)
+    message = Column(String(255), nullable=False, unique=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     user = relationship("User", back_populates="notifications")
     
 class Viewer(Base):
     __tablename__ = 'viewers'
-    __table_args__ = {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    __table_args__ = (
+        Index('uq_viewers_article_user', 'article_id', 'user_id', unique=True),
+        {'mysql_engine': 'InnoDB', 'mariadb_engine': 'InnoDB'}
+    )
     
-    id = Column(BIGINT(unsigned=True), primary_key=True, index=True)
-    user_id = Column(BIGINT(unsigned=True), ForeignKey('users.id'))
-    article_id = Column(BIGINT(unsigned=True), ForeignKey('articles.id'))
-    status = Column(TINYINT(unsigned=True), index=True, default=0)
-    created_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, index=True, default=datetime.datetime.utcnow)
+    id = Column(BIGINT_UNSIGNED, primary_key=True)
+    user_id = Column(BIGINT_UNSIGNED, ForeignKey('users.id'))
+    article_id = Column(BIGINT_UNSIGNED, ForeignKey('articles.id'))
+    status = Column(TINYINT_UNSIGNED, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     article = relationship("Article", back_populates="viewers")
     user = relationship("User", back_populates="viewers")
\ No newline at end of file
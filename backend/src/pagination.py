@@ -0,0 +1,92 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import or_, and_, func, select
+
+def encode_cursor(value, id: int) -> str:
+    if isinstance(value, datetime.datetime):
+        data = {"t": "dt", "v": value.isoformat(), "i": id}
+    else:
+        data = {"v": value, "i": id}
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = datetime.datetime.fromisoformat(data["v"]) if data.get("t") == "dt" else data["v"]
+        return value, int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+def page_query(query, page: int, limit: int, cursor: str | None, order_dir: str, order_desc: str, columns: dict, id_column):
+    """
+    Apply offset paging, or keyset paging on (columns[order_dir], id) when
+    `cursor` is not None. Works on a Query as well as a select() statement.
+    Returns (query, sort_column), sort_column is None in offset mode.
+    """
+    if cursor is None:
+        offset = ((page-1)*limit)
+        return query.limit(limit).offset(offset), None
+
+    sort_column = columns.get(order_dir)
+    if sort_column is None:
+        raise HTTPException(status_code=400, detail=f"Cursor pagination supports ordering by {', '.join(columns)} only.")
+
+    descending = order_desc.lower() == "desc"
+    keys = [id_column] if sort_column.key == id_column.key else [sort_column, id_column]
+    query = query.order_by(None).order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    if cursor != "":
+        value, last_id = decode_cursor(cursor)
+        compare = (lambda column, value: column < value) if descending else (lambda column, value: column > value)
+        if len(keys) == 1:
+            query = query.filter(compare(id_column, last_id))
+        else:
+            query = query.filter(or_(compare(sort_column, value), and_(sort_column == value, compare(id_column, last_id))))
+
+    return query.limit(limit + 1), sort_column
+
+def page_rows(rows: list, limit: int, sort_column, entity=None) -> tuple:
+    if sort_column is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = entity(rows[-1]) if entity else rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), last.id)
+
+def paginate(query, count_query, page: int, limit: int, cursor: str | None, include_total: bool, order_dir: str, order_desc: str, columns: dict, id_column, entity=None):
+    """
+    Offset pagination by default. A non-None `cursor` ("" for the first page)
+    switches to keyset pagination on (columns[order_dir], id).
+    Returns (rows, total, next_cursor).
+    """
+    total = count_query.count() if include_total else None
+    query, sort_column = page_query(query, page, limit, cursor, order_dir, order_desc, columns, id_column)
+    rows, next_cursor = page_rows(query.all(), limit, sort_column, entity)
+    return rows, total, next_cursor
+
+async def paginate_async(db, statement, count_statement, page: int, limit: int, cursor: str | None, include_total: bool, order_dir: str, order_desc: str, columns: dict, id_column, entity=None):
+    """
+    paginate() for select() statements on an AsyncSession.
+    """
+    total = None
+    if include_total:
+        total = (await db.execute(select(func.count()).select_from(count_statement.subquery()))).scalar()
+    statement, sort_column = page_query(statement, page, limit, cursor, order_dir, order_desc, columns, id_column)
+    rows, next_cursor = page_rows((await db.execute(statement)).all(), limit, sort_column, entity)
+    return rows, total, next_cursor
@@ -0,0 +1,57 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import asyncio
+
+from passlib.context import CryptContext
+from .config import settings
+from .metrics import PASSWORD_HASH_SECONDS
+from .workers import BoundedProcessPool
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.password_hash_rounds)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so hashing neither holds the GIL
+    of the serving worker nor takes threads from the request threadpool. A
+    login storm beyond `max_pending` queued operations is answered with 503
+    instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.pool = BoundedProcessPool(workers, max_pending, "Too many password requests, please try again later.")
+
+    def hash(self, password: str) -> str:
+        with PASSWORD_HASH_SECONDS.labels("hash").time():
+            return self.pool.submit(hash_password, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        with PASSWORD_HASH_SECONDS.labels("verify").time():
+            return self.pool.submit(verify_password, password, hashed).result()
+
+    async def hash_async(self, password: str) -> str:
+        with PASSWORD_HASH_SECONDS.labels("hash").time():
+            return await asyncio.wrap_future(self.pool.submit(hash_password, password))
+
+    async def verify_async(self, password: str, hashed: str) -> bool:
+        with PASSWORD_HASH_SECONDS.labels("verify").time():
+            return await asyncio.wrap_future(self.pool.submit(verify_password, password, hashed))
+
+    def close(self):
+        self.pool.close()
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
@@ -0,0 +1,62 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import hashlib
+
+import orjson
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+def encode_default(value):
+    # Called by orjson for types it does not serialize natively (ORM
+    # instances, Decimal, pydantic models, ...).
+    return jsonable_encoder(value)
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Datetimes, dates, UUIDs and nested
+    dicts and lists are serialized natively, so plain payloads do not need a
+    jsonable_encoder pass first, anything else falls back to it per value.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def version_etag(*parts) -> str:
+    # Weak, the parts identify a version of the resource rather than its bytes
+    return f'W/"{hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()}"'
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def json_body_response(request: Request, body: bytes, headers: dict | None = None) -> Response:
+    """
+    Send a pre-serialized JSON body with an ETag of its content, or 304 when
+    the client already holds that body.
+    """
+    etag = body_etag(body)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={**(headers or {}), "ETag": etag, "Cache-Control": "no-cache"})
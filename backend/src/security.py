@@ -9,9 +9,21 @@
  * with this source code.
 """
 
-from fastapi import Request, HTTPException
+from typing import Annotated
+from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from .auth import decodeJWT
+from .cache import LRUCache
+from .config import settings
+from .database import get_db, get_async_db
+from .model import User
+
+# Column values of recently resolved users by e-mail, rebuilt into session
+# bound instances without a SELECT. Disabled when USER_CACHE_TTL is 0.
+user_cache = LRUCache(settings.user_cache_size, "user")
 
 class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
@@ -22,19 +34,63 @@ class JWTBearer(HTTPBearer):
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            if not self.verify_jwt(credentials.credentials):
+            claims = self.verify_jwt(credentials.credentials)
+            if not claims:
                 raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+            request.state.claims = claims
             return credentials.credentials
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
 
-    def verify_jwt(self, jwtoken: str) -> bool:
-        isTokenValid: bool = False
-
+    def verify_jwt(self, jwtoken: str) -> dict | None:
         try:
             payload = decodeJWT(jwtoken)
         except:
             payload = None
-        if payload:
-            isTokenValid = True
-        return isTokenValid
\ No newline at end of file
+        return payload if payload else None
+
+jwt_bearer = JWTBearer()
+
+def user_columns(user: User) -> dict:
+    return {column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs}
+
+def forget_user(email: str):
+    user_cache.delete(email)
+
+def current_user(request: Request, token: str = Depends(jwt_bearer), db: Session = Depends(get_db)) -> User:
+    email = request.state.claims["UserId"]
+    data = user_cache.get(email) if settings.user_cache_ttl > 0 else None
+
+    if data is not None:
+        user = User(**data)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+
+    if settings.user_cache_ttl > 0:
+        user_cache.set(email, user_columns(user), settings.user_cache_ttl)
+    return user
+
+CurrentUser = Annotated[User, Depends(current_user)]
+
+async def async_current_user(request: Request, token: str = Depends(jwt_bearer), db: AsyncSession = Depends(get_async_db)) -> User:
+    email = request.state.claims["UserId"]
+    data = user_cache.get(email) if settings.user_cache_ttl > 0 else None
+
+    if data is not None:
+        user = User(**data)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+
+    if settings.user_cache_ttl > 0:
+        user_cache.set(email, user_columns(user), settings.user_cache_ttl)
+    return user
+
+AsyncCurrentUser = Annotated[User, Depends(async_current_user)]
\ No newline at end of file
@@ -7,64 +7,295 @@
  * For the full copyright and license information,
  * please view the LICENSE.md file that was distributed
  * with this source code.
+
+ Bulk synthetic data for load testing, deterministic under --seed:
+
+ python -m src.cli seed --users 100k --articles 1M --comments-per-article 5 --workers 4
 """
 
-import random
-import os
-import uuid
+import argparse
 import datetime
+import random
+import time
 
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import get_context
 from faker import Faker
-from faker.providers import internet, job
-from .database import get_db
-from dotenv import load_dotenv
-from random import randint
-from passlib.context import CryptContext
+from faker.providers import job
+from slugify import slugify
+from sqlalchemy import func, insert, select
+from . import database
+from .migration import run_migrations
+from .password import hash_password
+from .taxonomy import term_ids, refresh_facets
 from .model import * 
 
-load_dotenv()
-
-class Seed:
-    
-    def run(self):
-        APP_ENV = os.getenv("APP_ENV")
-        if(APP_ENV == 'development'):
-            self.seed_user()
-            
-    def hash_pass(self, password:str):
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        return pwd_context.hash(password)
-            
-    def seed_user(self):
-        db = next(get_db())
-        total_user = db.query(User).count()
-        _max = 100
-        if total_user == 0:
-            for _ in range(_max):
-                fake = Faker()
-                fake.add_provider(job)
-                gender = random.randint(1,2)
-                gender_char = "M" if gender == 1 else "F"
-                first_name = fake.first_name_male() if gender == 1 else fake.first_name_female()
-                last_name = fake.last_name()
-                email = fake.ascii_safe_email()
-                password = self.hash_pass("P@ssw0rd!123")
-                user = User(
-                    email = email,
-                    phone = fake.phone_number(),
-                    password = password,
-                    first_name = first_name,
-                    last_name = last_name,
-                    gender = gender_char,
-                    job_title = fake.job(),
-                    instagram = fake.user_name(),
-                    facebook = fake.user_name(),
-                    twitter = fake.user_name(),
-                    linked_in = fake.user_name(),
-                    country =  fake.country(),
-                    address = fake.street_address(),
-                    about_me = fake.paragraph(nb_sentences=5),
-                    confirmed = 1
-                )
-                db.add(user)
-            db.commit()
\ No newline at end of file
+# Fixed anchor for generated dates, so a seed reproduces the same rows on any day
+EPOCH = datetime.datetime(2024, 1, 1)
+SPAN = 365 * 24 * 3600
+PASSWORD = "P@ssw0rd!123"
+
+def scale(value: str) -> int:
+    """
+    Parse a row count such as 500, 100k or 1M.
+    """
+    value = value.strip().lower()
+    factor = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+    if factor > 1:
+        value = value[:-1]
+    return int(float(value) * factor)
+
+def chunk_random(plan: dict, phase: str, start: int) -> tuple:
+    # Every chunk gets its own generators keyed on its position, so the data
+    # does not depend on the number of workers or the order chunks finish in.
+    key = f"{plan['seed']}:{phase}:{start}"
+    fake = Faker()
+    fake.add_provider(job)
+    fake.seed_instance(key)
+    return random.Random(key), fake
+
+def moment(rng: random.Random) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(seconds=rng.randrange(SPAN))
+
+def user_rows(plan: dict, start: int, stop: int) -> dict:
+    rng, fake = chunk_random(plan, "users", start)
+    rows = []
+    for number in range(start, stop):
+        id = plan["base"]["users"] + number + 1
+        gender = rng.randint(1, 2)
+        first_name = fake.first_name_male() if gender == 1 else fake.first_name_female()
+        last_name = fake.last_name()
+        date = moment(rng)
+        rows.append({
+            "id": id,
+            "email": f"{first_name}.{last_name}.{id}@example.com".lower().replace("'", ""),
+            "phone": f"+1{id:010d}",
+            "password": plan["password"],
+            "first_name": first_name,
+            "last_name": last_name,
+            "gender": "M" if gender == 1 else "F",
+            "job_title": fake.job(),
+            "instagram": fake.user_name(),
+            "facebook": fake.user_name(),
+            "twitter": fake.user_name(),
+            "linked_in": fake.user_name(),
+            "country": fake.country(),
+            "address": fake.street_address(),
+            "about_me": fake.paragraph(nb_sentences=5),
+            "confirmed": 1,
+            "created_at": date,
+            "updated_at": date,
+        })
+    return {User: rows}
+
+def article_rows(plan: dict, start: int, stop: int) -> dict:
+    rng, fake = chunk_random(plan, "articles", start)
+    low, high = plan["authors"]
+    rows, categories, tags = [], [], []
+    for number in range(start, stop):
+        id = plan["base"]["articles"] + number + 1
+        sentence = fake.sentence(nb_words=6)[:-1]
+        names = {
+            "category": rng.sample(plan["categories"], rng.randint(1, 2)),
+            "tag": rng.sample(plan["tags"], rng.randint(1, 4)),
+        }
+        date = moment(rng)
+        rows.append({
+            "id": id,
+            "user_id": rng.randint(low, high),
+            "title": f"{sentence} {id}",
+            "slug": f"{slugify(sentence)}-{id}",
+            "description": fake.sentence(nb_words=12),
+            "content": fake.text(max_nb_chars=plan["content_size"]),
+            "categories": ','.join(names["category"]),
+            "tags": ','.join(names["tag"]),
+            "total_viewer": min(plan["viewers"], high - low + 1),
+            "total_comment": plan["comments"],
+            "status": 1 if rng.random() < 0.9 else 0,
+            "created_at": date,
+            "updated_at": date,
+        })
+        categories += [{"article_id": id, "category_id": plan["category_ids"][name.lower()]} for name in names["category"]]
+        tags += [{"article_id": id, "tag_id": plan["tag_ids"][name.lower()]} for name in names["tag"]]
+    return {Article: rows, ArticleCategory: categories, ArticleTag: tags}
+
+def comment_rows(plan: dict, start: int, stop: int) -> dict:
+    rng, fake = chunk_random(plan, "comments", start)
+    low, high = plan["authors"]
+    per_article = plan["comments"]
+    rows = []
+    for number in range(start, stop):
+        first = plan["base"]["comments"] + number * per_article + 1
+        for offset in range(per_article):
+            date = moment(rng)
+            rows.append({
+                "id": first + offset,
+                # About a third are replies to an earlier comment of the same article
+                "parent_id": first + rng.randrange(offset) if offset > 0 and rng.random() < 0.3 else None,
+                "article_id": plan["base"]["articles"] + number + 1,
+                "user_id": rng.randint(low, high),
+                "message": fake.sentence(nb_words=12),
+                "created_at": date,
+                "updated_at": date,
+            })
+    return {Comment: rows}
+
+def viewer_rows(plan: dict, start: int, stop: int) -> dict:
+    rng, _ = chunk_random(plan, "viewers", start)
+    low, high = plan["authors"]
+    total = min(plan["viewers"], high - low + 1)
+    rows = []
+    for number in range(start, stop):
+        date = moment(rng)
+        for user_id in rng.sample(range(low, high + 1), total):
+            rows.append({"article_id": plan["base"]["articles"] + number + 1, "user_id": user_id, "status": 0, "created_at": date, "updated_at": date})
+    return {Viewer: rows}
+
+def notification_rows(plan: dict, start: int, stop: int) -> dict:
+    rng, fake = chunk_random(plan, "notifications", start)
+    rows = []
+    for number in range(start, stop):
+        for _ in range(plan["notifications"]):
+            date = moment(rng)
+            rows.append({
+                "user_id": plan["base"]["users"] + number + 1,
+                "subject": "Comment Article",
+                "message": f"{fake.name()} commented on your article {fake.sentence(nb_words=4)[:-1]}",
+                "created_at": date,
+                "updated_at": date,
+            })
+    return {Notification: rows}
+
+PHASES = {
+    "users": user_rows,
+    "articles": article_rows,
+    "comments": comment_rows,
+    "viewers": viewer_rows,
+    "notifications": notification_rows,
+}
+
+def seed_chunk(plan: dict, phase: str, start: int, stop: int) -> int:
+    """
+    Generate and insert one chunk of a phase with multi-row INSERTs, in the
+    caller or in a worker process.
+    """
+    total = 0
+    with database.engine.begin() as connection:
+        for model, rows in PHASES[phase](plan, start, stop).items():
+            if len(rows) > 0:
+                connection.execute(insert(model).values(rows))
+                total += len(rows)
+    return total
+
+def seed_data(users: int = 100, articles: int = 0, comments: int = 0, viewers: int = 0, notifications: int = 0, seed: int = 2024, chunk: int = 1000, workers: int = 0, content_size: int = 2000, log=None):
+    """
+    Append synthetic rows to the database. Ids are assigned from the current
+    maximum of each table, articles, comments and viewers are written by the
+    users seeded in the same run (or by the existing users when `users` is 0).
+    """
+    if database.engine.dialect.name == "sqlite":
+        # One writer at a time, worker processes would only wait on the lock
+        workers = 0
+    with database.SessionLocal() as db:
+        base = {
+            "users": db.execute(select(func.coalesce(func.max(User.id), 0))).scalar(),
+            "articles": db.execute(select(func.coalesce(func.max(Article.id), 0))).scalar(),
+            "comments": db.execute(select(func.coalesce(func.max(Comment.id), 0))).scalar(),
+        }
+        authors = (base["users"] + 1, base["users"] + users) if users > 0 else tuple(db.execute(select(func.min(User.id), func.max(User.id))).one())
+        vocabulary = Faker()
+        vocabulary.seed_instance(f"{seed}:terms")
+        categories = sorted({word.capitalize() for word in vocabulary.words(60)})[:30]
+        tags = sorted({word.lower() for word in vocabulary.words(600)})[:300]
+        category_ids, tag_ids = {}, {}
+        if articles > 0:
+            if authors[0] is None:
+                raise ValueError("Articles need authors, seed some users first.")
+            category_ids = term_ids(db, Category, categories)
+            tag_ids = term_ids(db, Tag, tags)
+            db.commit()
+
+    plan = {
+        "seed": seed,
+        "base": base,
+        "authors": authors,
+        # Every seeded account shares one password, hash it once
+        "password": hash_password(PASSWORD) if users > 0 else None,
+        "categories": categories,
+        "tags": tags,
+        "category_ids": category_ids,
+        "tag_ids": tag_ids,
+        "comments": comments,
+        "viewers": viewers,
+        "notifications": notifications,
+        "content_size": content_size,
+    }
+    phases = [
+        ("users", users, chunk),
+        ("articles", articles, chunk),
+        ("comments", articles if comments > 0 else 0, max(1, chunk // max(comments, 1))),
+        ("viewers", articles if viewers > 0 else 0, max(1, chunk // max(viewers, 1))),
+        ("notifications", users if notifications > 0 else 0, max(1, chunk // max(notifications, 1))),
+    ]
+
+    executor = ProcessPoolExecutor(workers, mp_context=get_context("spawn")) if workers > 0 else None
+    try:
+        for phase, total, step in phases:
+            if total == 0:
+                continue
+            started = time.perf_counter()
+            starts = list(range(0, total, step))
+            stops = [min(start + step, total) for start in starts]
+            if executor is None:
+                rows = sum(seed_chunk(plan, phase, start, stop) for start, stop in zip(starts, stops))
+            else:
+                rows = sum(executor.map(seed_chunk, repeat(plan), repeat(phase), starts, stops))
+            if log is not None:
+                elapsed = time.perf_counter() - started
+                log(f"{phase:13} {rows:>10} rows {elapsed:8.1f} s {rows / max(elapsed, 1e-9):>10.0f} rows/s")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if articles > 0:
+        with database.SessionLocal() as db:
+            refresh_facets(db)
+            db.commit()
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=scale, default=scale("1k"))
+    parser.add_argument("--articles", type=scale, default=scale("10k"))
+    parser.add_argument("--comments-per-article", type=int, default=3)
+    parser.add_argument("--viewers-per-article", type=int, default=10)
+    parser.add_argument("--notifications-per-user", type=int, default=2)
+    parser.add_argument("--content-size", type=int, default=2000, help="maximum characters of an article body")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per INSERT")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 inserts in this process")
+    parser.add_argument("--seed", type=int, default=2024)
+
+def run_seed(args: argparse.Namespace):
+    run_migrations(database.engine)
+
+    started = time.perf_counter()
+    seed_data(
+        users=args.users,
+        articles=args.articles,
+        comments=args.comments_per_article,
+        viewers=args.viewers_per_article,
+        notifications=args.notifications_per_user,
+        seed=args.seed,
+        chunk=args.chunk,
+        workers=args.workers,
+        content_size=args.content_size,
+        log=print,
+    )
+    print(f"done in {time.perf_counter() - started:.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic data for load testing")
+    add_arguments(parser)
+    run_seed(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import datetime
+
+from sqlalchemy import select, delete, func, literal
+from .model import Article, Category, Tag, ArticleCategory, ArticleTag, ArticleFacet
+
+# facet name -> (term model, link model, link column to the term)
+FACETS = {
+    "category": (Category, ArticleCategory, ArticleCategory.category_id),
+    "tag": (Tag, ArticleTag, ArticleTag.tag_id),
+}
+
+def split_terms(value) -> list:
+    """
+    Normalize a comma separated string or a list of names: trimmed, lower
+    cased, non-empty and unique, in their original order. Terms are stored
+    and looked up in this form, so the match does not depend on the column
+    collation (case-insensitive on MySQL, binary on SQLite).
+    """
+    if not value:
+        return []
+    names = value.split(',') if isinstance(value, str) else value
+    return list(dict.fromkeys(name for name in (normalize_term(name) for name in names) if name))
+
+def normalize_term(name: str) -> str:
+    return name.strip().lower()[:191]
+
+def term_ids(db, model, names: list) -> dict:
+    """
+    Ids of the given names keyed by normalized name, creating missing terms.
+    """
+    names = split_terms(names)
+    if len(names) == 0:
+        return {}
+    found = {name.lower(): id for name, id in db.execute(select(model.name, model.id).where(model.name.in_(names))).all()}
+    missing = [name for name in names if name not in found]
+    if len(missing) > 0:
+        date_now = datetime.datetime.now()
+        statement = model.__table__.insert().prefix_with("IGNORE", dialect="mysql").prefix_with("IGNORE", dialect="mariadb").prefix_with("OR IGNORE", dialect="sqlite")
+        db.execute(statement, [{"name": name, "created_at": date_now, "updated_at": date_now} for name in missing])
+        found.update({name.lower(): id for name, id in db.execute(select(model.name, model.id).where(model.name.in_(missing))).all()})
+    return found
+
+def link_terms(db, articles: dict) -> dict:
+    """
+    Replace the links of every article in `articles`, a dict of article id to
+    {"category": [names], "tag": [names]}, with a few set based statements
+    per batch. Returns the term ids per facet whose counts may have changed.
+    """
+    changed = {}
+    for facet, (term, link, column) in FACETS.items():
+        names = {article_id: split_terms(terms.get(facet)) for article_id, terms in articles.items()}
+        ids = term_ids(db, term, split_terms([name for values in names.values() for name in values]))
+        wanted = {(article_id, ids[name.lower()]) for article_id, values in names.items() for name in values if name.lower() in ids}
+        current = {(article_id, term_id) for article_id, term_id in db.execute(select(link.article_id, column).where(link.article_id.in_(list(articles)))).all()}
+        stale = {}
+        for article_id, term_id in current - wanted:
+            stale.setdefault(article_id, []).append(term_id)
+        for article_id, stale_ids in stale.items():
+            db.execute(delete(link).where(link.article_id == article_id, column.in_(stale_ids)))
+        missing = wanted - current
+        if len(missing) > 0:
+            db.execute(link.__table__.insert(), [{"article_id": article_id, column.key: term_id} for article_id, term_id in missing])
+        changed[facet] = {term_id for _, term_id in current | wanted}
+    return changed
+
+def refresh_facets(db, changed: dict | None = None):
+    """
+    Recount published articles per term into `article_facets`, for the term
+    ids in `changed` or for every term when it is None.
+    """
+    for facet, (term, link, column) in FACETS.items():
+        ids = None if changed is None else changed.get(facet, set())
+        if ids is not None and len(ids) == 0:
+            continue
+        remove = delete(ArticleFacet).where(ArticleFacet.facet == facet)
+        counts = (
+            select(literal(facet), term.id, term.name, func.count(Article.id), func.now())
+            .select_from(term)
+            .join(link, column == term.id)
+            .join(Article, Article.id == link.article_id)
+            .where(Article.status == 1)
+            .group_by(term.id, term.name)
+        )
+        if ids is not None:
+            remove = remove.where(ArticleFacet.term_id.in_(list(ids)))
+            counts = counts.where(term.id.in_(list(ids)))
+        db.execute(remove)
+        db.execute(ArticleFacet.__table__.insert().from_select(["facet", "term_id", "name", "total", "updated_at"], counts))
+
+def filter_terms(query, category: str | None = None, tag: str | None = None):
+    """
+    Restrict an article Query or select() to a category and/or tag name.
+    """
+    if category:
+        query = query.filter(Article.id.in_(select(ArticleCategory.article_id).join(Category, Category.id == ArticleCategory.category_id).where(Category.name == normalize_term(category))))
+    if tag:
+        query = query.filter(Article.id.in_(select(ArticleTag.article_id).join(Tag, Tag.id == ArticleTag.tag_id).where(Tag.name == normalize_term(tag))))
+    return query
+
+def facet_counts(db, facet: str, limit: int) -> list:
+    rows = db.execute(
+        select(ArticleFacet.name, ArticleFacet.total)
+        .where(ArticleFacet.facet == facet, ArticleFacet.total > 0)
+        .order_by(ArticleFacet.total.desc(), ArticleFacet.name.asc())
+        .limit(limit)
+    ).all()
+    return [{"name": name, "total": total} for name, total in rows]
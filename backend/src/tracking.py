@@ -0,0 +1,126 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import datetime
+import logging
+import threading
+
+from sqlalchemy import insert, update
+from . import database
+from .activity import activity_log
+from .cache import LRUCache, article_list_cache
+from .config import settings
+from .model import Article, Viewer
+
+logger = logging.getLogger(__name__)
+
+class ViewTracker:
+    """
+    Write-behind article view counter. Reads are deduplicated per (article,
+    user) in a bounded LRU and queued in memory; a background thread flushes
+    them every `flush_interval` seconds with INSERT IGNORE into `viewers` and a
+    relative `total_viewer = total_viewer + n` update. The unique
+    (article_id, user_id) index on `viewers` stays the source of truth, so only
+    rows that were really inserted are counted, and only those get the
+    reader's "Read Article" activity. Views of a failed flush are
+    queued again, after `max_attempts` failures they are dropped and forgotten
+    by the LRU so a later read queues them anew.
+    """
+
+    max_attempts = 5
+
+    def __init__(self, max_seen: int, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._seen = LRUCache(max_seen)
+        self._pending = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def track(self, article_id: int, user_id: int, description: str | None = None) -> bool:
+        key = f"{article_id}:{user_id}"
+        if self._seen.get(key) is not None:
+            return False
+        self._seen.set(key, True)
+        with self._lock:
+            self._pending.setdefault(article_id, {})[user_id] = (datetime.datetime.now(), description)
+        self.start()
+        return True
+
+    def pending(self, article_id: int) -> int:
+        return len(self._pending.get(article_id, {}))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="view-tracker", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        total = 0
+        for article_id, views in pending.items():
+            try:
+                inserted = []
+                with database.engine.begin() as connection:
+                    statement = insert(Viewer).prefix_with("IGNORE", dialect="mysql").prefix_with("IGNORE", dialect="mariadb").prefix_with("OR IGNORE", dialect="sqlite")
+                    # One row per execute, an executemany rowcount does not
+                    # say which of the rows the unique index ignored
+                    for user_id, (date, description) in views.items():
+                        if connection.execute(statement, {"article_id": article_id, "user_id": user_id, "status": 0, "created_at": date, "updated_at": date}).rowcount > 0:
+                            inserted.append((user_id, description))
+                    if len(inserted) > 0:
+                        connection.execute(update(Article).where(Article.id == article_id).values(total_viewer=Article.total_viewer + len(inserted), updated_at=max(date for date, _ in views.values())))
+                total += len(inserted)
+                self._attempts.pop(article_id, None)
+            except Exception:
+                logger.exception("Unable to flush %s views of article %s", len(views), article_id)
+                self._retry(article_id, views)
+                continue
+            for user_id, description in inserted:
+                if description is not None:
+                    activity_log.log(user_id, "Read Article", description)
+        if total > 0:
+            article_list_cache.invalidate()
+        return total
+
+    def _retry(self, article_id: int, views: dict):
+        attempts = self._attempts.get(article_id, 0) + 1
+        if attempts >= self.max_attempts:
+            self._attempts.pop(article_id, None)
+            logger.error("Dropping %s views of article %s after %s failed flushes", len(views), article_id, attempts)
+            for user_id in views:
+                self._seen.delete(f"{article_id}:{user_id}")
+            return
+        self._attempts[article_id] = attempts
+        with self._lock:
+            queued = self._pending.setdefault(article_id, {})
+            for user_id, view in views.items():
+                queued.setdefault(user_id, view)
+
+view_tracker = ViewTracker(settings.view_tracker_size, settings.view_flush_interval)
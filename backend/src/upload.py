@@ -0,0 +1,280 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import anyio
+
+from fastapi import Request, HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import func, select
+from .config import settings
+from .database import SessionLocal
+from .image import NAME_PATTERN, image_derivatives
+from .model import User, Article
+
+logger = logging.getLogger(__name__)
+
+# (offset, magic bytes, extension) checked against the first bytes of a file,
+# the client supplied filename and content type are not trusted.
+SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"\xff\xd8\xff", "jpg"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (8, b"WEBP", "webp"),
+]
+SNIFF_SIZE = 16
+
+# Request body description for the docs, the handlers read the raw stream
+# instead of declaring an UploadFile parameter.
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file_image": {"type": "string", "format": "binary"}},
+                    "required": ["file_image"],
+                }
+            }
+        },
+    }
+}
+
+def sniff(head: bytes) -> str | None:
+    for offset, magic, extension in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if extension == "webp" and head[:4] != b"RIFF":
+                continue
+            return extension
+    return None
+
+class ImagePart:
+    """
+    Collects the bytes of one multipart file field as the parser emits them.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.headers = {}
+        self.header_name = b""
+        self.header_value = b""
+        self.current = False
+        self.found = False
+        self.chunks = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_name.lower()] = self.header_value
+        self.header_name = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        self.current = not self.found and options.get(b"name") == self.field.encode() and b"filename" in options
+        self.found = self.found or self.current
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.current:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        self.current = False
+
+    def take(self) -> list:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+async def receive_image(request: Request, field: str = "file_image") -> str:
+    """
+    Stream the `field` file of a multipart request into the upload directory
+    and return its name, the value stored in `image` columns. The size limit
+    and the type check are applied while the body arrives, the data goes to a
+    temp file that is renamed to the sha256 of its content, so an image
+    uploaded twice is stored once.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+    # Multipart framing adds a little on top of the file itself
+    if int(request.headers.get("content-length", 0)) > settings.upload_max_size + 16384:
+        raise HTTPException(status_code=413, detail=f"The image may not be larger than {settings.upload_max_size // 1024} KB.")
+
+    part = ImagePart(field)
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    digest = hashlib.sha256()
+    head = b""
+    extension = None
+    size = 0
+
+    descriptor, temp_path = tempfile.mkstemp(prefix=".upload-", dir=settings.upload_dir)
+    os.close(descriptor)
+    try:
+        async with await anyio.open_file(temp_path, "wb") as file:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for data in part.take():
+                    size += len(data)
+                    if size > settings.upload_max_size:
+                        raise HTTPException(status_code=413, detail=f"The image may not be larger than {settings.upload_max_size // 1024} KB.")
+                    if extension is None:
+                        head += data[:SNIFF_SIZE]
+                        if len(head) >= SNIFF_SIZE:
+                            extension = sniff(head)
+                            if extension not in settings.upload_allowed_types:
+                                raise HTTPException(status_code=415, detail=f"Allowed image types are {', '.join(settings.upload_allowed_types)}.")
+                    digest.update(data)
+                    await file.write(data)
+            parser.finalize()
+
+        if not part.found or size == 0:
+            raise HTTPException(status_code=400, detail=f"The {field} file is required.")
+        if extension is None:
+            extension = sniff(head)
+            if extension not in settings.upload_allowed_types:
+                raise HTTPException(status_code=415, detail=f"Allowed image types are {', '.join(settings.upload_allowed_types)}.")
+
+        name = f"{digest.hexdigest()}.{extension}"
+        path = f"{settings.upload_dir}/{name}"
+        if os.path.exists(path):
+            # Same content already stored, refresh its mtime so a concurrent
+            # cleanup of the previous owner leaves it alone
+            os.utime(path)
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+        return name
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class UploadFiles(StaticFiles):
+    """
+    Serves the upload directory. Stored names are the sha256 of the content,
+    so the name doubles as a strong ETag and a file never changes under its
+    URL. Range requests and zero-copy `http.response.pathsend` (on servers
+    that offer it) come from Starlette's FileResponse.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200):
+        headers = {"cache-control": "public, max-age=31536000, immutable"}
+        stem = os.path.basename(full_path).rsplit(".", 1)[0]
+        if len(stem) == 64 and all(char in "0123456789abcdef" for char in stem):
+            headers["etag"] = f'"{stem}"'
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def upload_url(image: str | None) -> str | None:
+    """
+    Public URL of a stored upload, served by the UploadFiles mount.
+    """
+    if not image:
+        return None
+    return f"{settings.upload_url}/{image}"
+
+class UploadCleanup:
+    """
+    Deletes replaced images once no user or article refers to them any more.
+    Files touched in the last `grace` seconds may be about to be referenced by
+    a duplicate upload, they are checked again when the grace has passed.
+    `close` runs the waiting checks whose grace is over; files still inside
+    it are left in place, another worker may be about to reference them.
+    """
+
+    def __init__(self, grace: float = 60):
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._timers = {}
+
+    def remove(self, image: str | None, retry: bool = True):
+        if image is None or NAME_PATTERN.match(image) is None:
+            return
+        path = f"{settings.upload_dir}/{image}"
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age < self.grace:
+                if retry:
+                    self._retry(image, self.grace - age)
+                else:
+                    logger.info("Leaving upload %s in place, it is younger than the grace", image)
+                return
+            with SessionLocal() as db:
+                references = db.execute(select(func.count()).select_from(User).where(User.image == image)).scalar()
+                references += db.execute(select(func.count()).select_from(Article).where(Article.image == image)).scalar()
+            if references == 0:
+                os.remove(path)
+                image_derivatives.remove(image)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Unable to clean up upload %s", image)
+
+    def _retry(self, image: str, delay: float):
+        with self._lock:
+            if image in self._timers:
+                return
+            timer = threading.Timer(delay + 1, self._run, (image,))
+            timer.daemon = True
+            self._timers[image] = timer
+            timer.start()
+
+    def _run(self, image: str):
+        with self._lock:
+            if self._timers.pop(image, None) is None:
+                return
+        self.remove(image)
+
+    def close(self):
+        with self._lock:
+            timers, self._timers = self._timers, {}
+        for image, timer in timers.items():
+            timer.cancel()
+            self.remove(image, retry=False)
+
+upload_cleanup = UploadCleanup()
+
+def remove_unused_upload(image: str | None):
+    """
+    Background task of the upload routes, see UploadCleanup.
+    """
+    upload_cleanup.remove(image)
@@ -9,149 +9,209 @@
  * with this source code.
 """
 
-from fastapi import APIRouter, Depends, Security, File, UploadFile
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, File, UploadFile
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
-from .security import JWTBearer
-from .auth import auth_user
-from .database import get_db
+from .security import CurrentUser
+from .database import get_db, unit_of_work
+from .responses import ORJSONResponse
+from .activity import activity_log
+from .cache import article_list_cache
+from .upload import upload_url
 from .schema import *
 from .model import *
 
 comment_route = APIRouter()
-security = HTTPBearer()
+
+MAX_THREAD_DEPTH = 5
 
 def BuildTree(elements: list, parent_id: int | None = None):
+    nodes = {}
+    for element in elements:
+        element["children"] = []
+        nodes[element["id"]] = element
     result = []
     for element in elements:
         if element["parent_id"] == parent_id:
-            children = BuildTree(elements, element["id"])
-            if len(children) > 0:
-                element["children"] = children
-            else:
-                element["children"] = []
             result.append(element)
+        elif element["parent_id"] in nodes:
+            nodes[element["parent_id"]]["children"].append(element)
     return result
 
+def CommentNode(comment: Comment, user: User) -> dict:
+    return {
+        'id': comment.id,
+        'parent_id': comment.parent_id,
+        'message': comment.message,
+        'created_at': comment.created_at,
+        'user': {
+            'image': upload_url(user.image),
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'gender': user.gender,
+            'email': user.email
+        }
+    }
+
+def LoadReplies(db: Session, nodes: list, replies: int, depth: int):
+    """
+    Attach up to `replies` newest replies to every node, `depth` levels deep,
+    with one query per level. Every node, the ones of the last level too,
+    carries `total_replies` so the client knows whether more can be fetched
+    from /api/comment/replies/{id}.
+    """
+    level = nodes
+    while len(level) > 0:
+        parents = {node["id"]: node for node in level}
+        for node in level:
+            node["children"] = []
+            node["total_replies"] = 0
+        totals = db.query(Comment.parent_id, func.count(Comment.id)).filter(Comment.parent_id.in_(list(parents))).group_by(Comment.parent_id).all()
+        for parent_id, total in totals:
+            parents[parent_id]["total_replies"] = total
+        if depth <= 0:
+            break
+        depth -= 1
+        position = func.row_number().over(partition_by=Comment.parent_id, order_by=Comment.id.desc()).label("position")
+        ranked = db.query(Comment.id, position).filter(Comment.parent_id.in_(list(parents))).subquery()
+        data = db.query(Comment, User).join(User).join(ranked, ranked.c.id == Comment.id).filter(ranked.c.position <= replies).order_by(Comment.id.desc()).all()
+        level = []
+        for comment, user in data:
+            node = CommentNode(comment, user)
+            parents[comment.parent_id]["children"].append(node)
+            level.append(node)
+
 @comment_route.get("/api/comment/list/{id}", tags=["comment_list"])
-def comment_list(id: int, db: Session = Depends(get_db)):
+def comment_list(
+        id: int,
+        db: Session = Depends(get_db),
+        page: int | None = None,
+        limit: int = 10,
+        replies: int = 3,
+        depth: int = 2
+    ):
     
-    article = db.query(Article).filter(Article.id == id).first()
+    article = db.query(Article.id).filter(Article.id == id).first()
     
     if not article:
-        return JSONResponse(content=f"Article with id {id} was not found.!!", status_code=400)
+        return ORJSONResponse(content=f"Article with id {id} was not found.!!", status_code=400)
+    
+    # Paginated thread mode, top level comments by page with a few replies each
+    if page != None:
+        total = db.query(Comment).filter(and_(Comment.article_id == id, Comment.parent_id == None)).count()
+        offset = ((page-1)*limit)
+        data = db.query(Comment, User).join(User).filter(and_(Comment.article_id == id, Comment.parent_id == None)).order_by(Comment.id.desc()).limit(limit).offset(offset).all()
+        result = [CommentNode(comment, user) for comment, user in data]
+        LoadReplies(db, result, replies, min(depth, MAX_THREAD_DEPTH))
+        payload = {
+            'message': 'ok',
+            'total': total,
+            'data': result
+        }
+        return ORJSONResponse(content=payload, status_code=200)
     
     data = db.query(Comment, User).join(User).order_by(text("comments.id desc")).filter(Comment.article_id == id).all()
     result = []
     
     for comment in data:
-        result.append({
-            'id': comment[0].id,
-            'parent_id': comment[0].parent_id,
-            'message': comment[0].message,
-            'created_at': comment[0].created_at,
-            'user': {
-                'image': comment[1].image,
-                'first_name': comment[1].first_name,
-                'last_name': comment[1].last_name,
-                'gender': comment[1].gender,
-                'email': comment[1].email
-            }
-        })
+        result.append(CommentNode(comment[0], comment[1]))
     
     payload = {
         'message': 'ok',
         'data': BuildTree(result)
     }
     
-    return JSONResponse(content=jsonable_encoder(payload), status_code=200)
+    return ORJSONResponse(content=payload, status_code=200)
 
+@comment_route.get("/api/comment/replies/{id}", tags=["comment_replies"])
+def comment_replies(
+        id: int,
+        db: Session = Depends(get_db),
+        page: int = 1,
+        limit: int = 10,
+        replies: int = 3,
+        depth: int = 1
+    ):
+    
+    comment = db.query(Comment.id).filter(Comment.id == id).first()
+    
+    if not comment:
+        return ORJSONResponse(content=f"Comment with id {id} was not found.!!", status_code=400)
+    
+    total = db.query(Comment).filter(Comment.parent_id == id).count()
+    offset = ((page-1)*limit)
+    data = db.query(Comment, User).join(User).filter(Comment.parent_id == id).order_by(Comment.id.desc()).limit(limit).offset(offset).all()
+    result = [CommentNode(comment, user) for comment, user in data]
+    LoadReplies(db, result, replies, min(depth, MAX_THREAD_DEPTH))
+    
+    payload = {
+        'message': 'ok',
+        'total': total,
+        'data': result
+    }
+    
+    return ORJSONResponse(content=payload, status_code=200)
 
-@comment_route.post("/api/comment/create/{id}",  dependencies=[Depends(JWTBearer())], tags=["comment_create"])
-def comment_create(id: int, input: ArticleCommentSchema, db: Session = Depends(get_db), credentials: HTTPAuthorizationCredentials = Security(security)):
+
+@comment_route.post("/api/comment/create/{id}", tags=["comment_create"])
+def comment_create(id: int, input: ArticleCommentSchema, session_user: CurrentUser, db: Session = Depends(get_db)):
     
-    article = db.query(Article).filter(Article.id == id).first()
-    access_token = credentials.credentials
-    session = auth_user(access_token)
-    user_id = session["id"]
-    session_user = db.query(User).filter(User.id == user_id).first()
+    article = db.query(Article.id, Article.title, Article.user_id).filter(Article.id == id).first()
+    user_id = session_user.id
     
     if not article:
-        return JSONResponse(content=f"Article with id {id} was not found.!!", status_code=400)
+        return ORJSONResponse(content=f"Article with id {id} was not found.!!", status_code=400)
     
     date_now = datetime.datetime.now()
-    comment = Comment(
-        article_id = id,
-        user_id = user_id,
-        parent_id = input.parent_id,
-        message = input.comment,
-        created_at = date_now,
-        updated_at = date_now
-    )
-    db.add(comment)
-    db.commit()
-    
-    activity = Activity(
-        user = session_user,
-        event = input.parent_id is not None if input.parent_id == "Reply comment to article" else "Create comment to article",
-        description = input.parent_id is not None if input.parent_id == f"Comment of article {article.title} as been replied" else f"Comment of article ${article.title} as been created",
-        created_at = date_now,
-        updated_at = date_now,
-    )
-    db.add(activity)
-    db.commit()
-    
-    if user_id != article.user_id:
-        notification = Notification(
-            user = session_user,
-            subject = input.parent_id is not None if input.parent_id == "Reply comment to article" else "Create comment to article",
-            message = input.parent_id is not None if input.parent_id == f"Comment of article {article.title} as been replied" else f"Comment of article ${article.title} as been created",
+    event = "Reply comment to article" if input.parent_id is not None else "Create comment to article"
+    description = f"Comment of article {article.title} as been replied" if input.parent_id is not None else f"Comment of article {article.title} as been created"
+    
+    with unit_of_work(db):
+        comment = Comment(
+            article_id = id,
+            user_id = user_id,
+            parent_id = input.parent_id,
+            message = input.comment,
             created_at = date_now,
-            updated_at = date_now,
+            updated_at = date_now
         )
-        db.add(notification)
-        db.commit()
+        db.add(comment)
         
-    total_comment = db.query(Comment).filter(Comment.article == article).count()
-    db.query(Article).filter(Article.id == article.id).update({ 'total_comment': total_comment, 'updated_at': date_now }, synchronize_session=False)
-    db.commit()
-    
-    return JSONResponse(content="ok", status_code=200)
+        if user_id != article.user_id:
+            notification = Notification(
+                user_id = article.user_id,
+                subject = event,
+                message = description,
+                created_at = date_now,
+                updated_at = date_now,
+            )
+            db.add(notification)
+            
+        db.query(Article).filter(Article.id == id).update({ 'total_comment': Article.total_comment + 1, 'updated_at': date_now }, synchronize_session=False)
+    
+    activity_log.log(user_id, event, description)
+    article_list_cache.invalidate()
+    
+    return ORJSONResponse(content="ok", status_code=200)
 
-@comment_route.delete("/api/comment/remove/{id}",  dependencies=[Depends(JWTBearer())], tags=["comment_remove"])
-def comment_remove(id: int, credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+@comment_route.delete("/api/comment/remove/{id}", tags=["comment_remove"])
+def comment_remove(id: int, session_user: CurrentUser, db: Session = Depends(get_db)):
     
     date_now = datetime.datetime.now()
-    access_token = credentials.credentials
-    session = auth_user(access_token)
-    user_id = session["id"]
-    session_user = db.query(User).filter(User.id == user_id).first()
-    comment = db.query(Comment).filter(and_(Comment.id == id, Comment.user == session_user)).first()
-    
-    if not comment:
-        return JSONResponse(content=f"Comment with id {id} was not found.!!", status_code=400)
+    user_id = session_user.id
+    row = db.query(Comment, Article.title).join(Article).filter(and_(Comment.id == id, Comment.user_id == user_id)).first()
     
-    db.delete(comment)
-    db.commit()
+    if not row:
+        return ORJSONResponse(content=f"Comment with id {id} was not found.!!", status_code=400)
     
-    article = db.query(Article).filter(Article.id == comment.article_id).first()
+    comment, title = row
     
-    activity = Activity(
-        user = session_user,
-        event = "Delete comment",
-        description = f"The user delete comment of article with title {article.title}",
-        created_at = date_now,
-        updated_at = date_now,
-    )
-    db.add(activity)
-    db.commit()
+    with unit_of_work(db):
+        db.delete(comment)
+        db.query(Article).filter(and_(Article.id == comment.article_id, Article.total_comment > 0)).update({ 'total_comment': Article.total_comment - 1, 'updated_at': date_now }, synchronize_session=False)
     
-    total_comment = db.query(Comment).filter(Comment.article == article).count()
-    db.query(Article).filter(Article.id == article.id).update({ 'total_comment': total_comment, 'updated_at': date_now }, synchronize_session=False)
-    db.commit()
+    activity_log.log(user_id, "Delete comment", f"The user delete comment of article with title {title}")
+    article_list_cache.invalidate()
     
-    return JSONResponse(content="ok", status_code=200)
\ No newline at end of file
+    return ORJSONResponse(content="ok", status_code=200)
\ No newline at end of file
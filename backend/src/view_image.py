@@ -0,0 +1,38 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse
+from .responses import ORJSONResponse
+from .image import image_derivatives
+
+image_route = APIRouter()
+
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+@image_route.get("/api/image/{width}/{name}", tags=["image"])
+async def image_derivative(width: int, name: str, request: Request):
+
+    if width not in image_derivatives.widths:
+        return ORJSONResponse(content=f"Supported image widths are {', '.join(map(str, image_derivatives.widths))}.", status_code=400)
+
+    webp = "image/webp" in request.headers.get("accept", "")
+    try:
+        path = await image_derivatives.get(name, width, webp)
+    except OSError:
+        return ORJSONResponse(content=f"Image {name} can not be resized.", status_code=415)
+
+    if path is None:
+        return ORJSONResponse(content=f"Image {name} was not found.!!", status_code=404)
+
+    # Upload names are content hashes, a variant never changes under its URL
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept"}
+    return FileResponse(path, media_type=MEDIA_TYPES[path.rsplit(".", 1)[-1]], headers=headers)
@@ -0,0 +1,22 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from .metrics import latest, record_pool
+
+metrics_route = APIRouter()
+
+@metrics_route.get("/metrics", tags=["metrics"], include_in_schema=False)
+def metrics():
+    record_pool()
+    return Response(content=latest(), media_type=CONTENT_TYPE_LATEST)
@@ -9,90 +9,79 @@
  * with this source code.
 """
 
-from fastapi import APIRouter, Depends, Security
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi import APIRouter, Depends
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
-from .security import JWTBearer
-from .auth import auth_user
-from .database import get_db
+from .security import CurrentUser
+from .database import get_db, unit_of_work
+from .responses import ORJSONResponse
+from .activity import activity_log
+from .pagination import paginate
 from .schema import *
 from .model import *
 
 notification_route = APIRouter()
-security = HTTPBearer()
 
-@notification_route.get("/api/notification/list",  dependencies=[Depends(JWTBearer())], tags=["account_notification_list"])
+CURSOR_COLUMNS = {
+    "notifications.id": Notification.id,
+    "notifications.created_at": Notification.created_at,
+}
+
+@notification_route.get("/api/notification/list", tags=["account_notification_list"])
 def notification_list(
-        credentials: HTTPAuthorizationCredentials = Security(security),
+        session_user: CurrentUser,
         db: Session = Depends(get_db),
         page: int = 1,
         limit: int = 10,
         order_dir: str = "notifications.id",
         order_desc: str = "desc",
-        search: str | None = None
+        search: str | None = None,
+        cursor: str | None = None,
+        include_total: bool = True
     ):
    
-    offset = ((page-1)*limit)
-    access_token = credentials.credentials
-    session = auth_user(access_token)
-    user_id = session["id"]
-    total = db.query(Notification).filter(User.id == user_id).count()
-    data = db.query(Notification).order_by(text(f"{order_dir} {order_desc}")).filter(User.id == user_id)
+    user_id = session_user.id
+    total_query = db.query(Notification).filter(Notification.user_id == user_id)
+    data = db.query(Notification).order_by(text(f"{order_dir} {order_desc}")).filter(Notification.user_id == user_id)
     
     if search != None:
         data = data.filter(or_(Notification.subject.ilike(f'%{search}%'), Notification.message.ilike(f'%{search}%')))
         
-    data = data.limit(limit).offset(offset)
+    results, total, next_cursor = paginate(data, total_query, page, limit, cursor, include_total, order_dir, order_desc, CURSOR_COLUMNS, Notification.id)
 
     payload = {
         "total": total,
-        "data": data.all()
+        "data": results,
+        "next_cursor": next_cursor
     }
    
-    return JSONResponse(content=jsonable_encoder(payload), status_code=200)
+    return ORJSONResponse(content=jsonable_encoder(payload), status_code=200)
 
-@notification_route.get("/api/notification/read/{id}",  dependencies=[Depends(JWTBearer())], tags=["account_notification_read"])
-def notification_read(id: int, credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+@notification_route.get("/api/notification/read/{id}", tags=["account_notification_read"])
+def notification_read(id: int, session_user: CurrentUser, db: Session = Depends(get_db)):
     
-    access_token = credentials.credentials
-    session = auth_user(access_token)
-    user_id = session["id"]
-    session_user = db.query(User).filter(User.id == user_id).first()
+    user_id = session_user.id
     notification = db.query(Notification).filter(and_(Notification.id == id, Notification.user == session_user)).first()
     
     if not notification:
-        return JSONResponse(content=f"Notification with id {id} was not found.!!", status_code=400)
+        return ORJSONResponse(content=f"Notification with id {id} was not found.!!", status_code=400)
     
-    return JSONResponse(content=jsonable_encoder(notification), status_code=200)
+    return ORJSONResponse(content=jsonable_encoder(notification), status_code=200)
 
-@notification_route.delete("/api/notification/remove/{id}",  dependencies=[Depends(JWTBearer())], tags=["account_notification_remove"])
-def notification_remove(id: int, credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+@notification_route.delete("/api/notification/remove/{id}", tags=["account_notification_remove"])
+def notification_remove(id: int, session_user: CurrentUser, db: Session = Depends(get_db)):
     
-    date_now = datetime.datetime.now()
-    access_token = credentials.credentials
-    session = auth_user(access_token)
-    user_id = session["id"]
-    session_user = db.query(User).filter(User.id == user_id).first()
+    user_id = session_user.id
     notification = db.query(Notification).filter(and_(Notification.id == id, Notification.user == session_user)).first()
     
     if not notification:
-        return JSONResponse(content=f"Notification with id {id} was not found.!!", status_code=400)
+        return ORJSONResponse(content=f"Notification with id {id} was not found.!!", status_code=400)
     
-    db.delete(notification)
-    db.commit()
+    with unit_of_work(db):
+        db.delete(notification)
     
-    activity = Activity(
-        user = session_user,
-        event = "Delete notification",
-        description = f"The user delete notification with subject {notification.subject}",
-        created_at = date_now,
-        updated_at = date_now,
-    )
-    db.add(activity)
-    db.commit()
+    activity_log.log(user_id, "Delete notification", f"The user delete notification with subject {notification.subject}")
     
-    return JSONResponse(content="ok", status_code=200)
\ No newline at end of file
+    return ORJSONResponse(content="ok", status_code=200)
\ No newline at end of file
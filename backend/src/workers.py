@@ -0,0 +1,84 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+"""
+
+import functools
+import multiprocessing
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+
+class BoundedProcessPool:
+    """
+    Process pool for CPU bound work that would otherwise hold the GIL of the
+    serving worker. The pool starts on first use, at most `max_pending` tasks
+    are queued and further submissions are answered with 503 `busy_detail`.
+    With `workers` set to 0 the work runs inline in the calling thread.
+
+    A worker that dies (OOM killer, crash in a C extension) breaks the whole
+    executor; it is then dropped and the next submission spawns a new one.
+    """
+
+    def __init__(self, workers: int, max_pending: int, busy_detail: str):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.busy_detail = busy_detail
+        self.pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args) -> Future:
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(function(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise HTTPException(status_code=503, detail=self.busy_detail)
+            try:
+                executor = self._spawn()
+                future = executor.submit(function, *args)
+            except BrokenProcessPool:
+                # Broken before this task reached it, a fresh pool can run it
+                self._discard(executor)
+                executor = self._spawn()
+                future = executor.submit(function, *args)
+            self.pending += 1
+        future.add_done_callback(functools.partial(self._done, executor))
+        return future
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _spawn(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, forking would copy the background writer threads' locks
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        # Called with the lock held, only the pool that broke is dropped
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, executor: ProcessPoolExecutor, future: Future):
+        with self._lock:
+            self.pending -= 1
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard(executor)
@@ -0,0 +1,67 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ Scrape /metrics of an app built by create_app() on a scratch SQLite
+ database. Each case runs in its own interpreter, the settings and
+ prometheus_client read the environment when they are imported.
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+SCRAPE = """
+from fastapi.testclient import TestClient
+from src.app import create_app
+from src.database import engine
+from src.migration import run_migrations
+
+run_migrations(engine)
+with TestClient(create_app()) as client:
+    assert client.get("/api/article/list").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.status_code
+    print(response.text)
+"""
+
+def scrape(tmp_path: Path, **env) -> str:
+    # The multiprocess directory only when the case asks for it
+    environment = {
+        **{key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"},
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'metrics.db'}",
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "ACTIVITY_SPILL_PATH": str(tmp_path / "activity.spill.jsonl"),
+        "SEARCH_ENGINE": "memory",
+        "PASSWORD_HASH_WORKERS": "0",
+        "IMAGE_WORKERS": "0",
+        "METRICS_ENABLED": "true",
+        **env,
+    }
+    result = subprocess.run([sys.executable, "-c", SCRAPE], cwd=BACKEND, env=environment, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def assert_scraped(text: str):
+    assert re.search(r'^http_requests_total\{[^}]*route="/api/article/list"[^}]*\} 1\.0$', text, re.MULTILINE), text
+    assert re.search(r'^db_pool_connections\{state="checked_out"\} ', text, re.MULTILINE), text
+
+def test_metrics(tmp_path):
+    assert_scraped(scrape(tmp_path))
+
+def test_metrics_multiprocess(tmp_path):
+    directory = tmp_path / "prometheus"
+    directory.mkdir()
+    assert_scraped(scrape(tmp_path, PROMETHEUS_MULTIPROC_DIR=str(directory)))
+    assert any(directory.iterdir())
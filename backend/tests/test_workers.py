@@ -0,0 +1,37 @@
+"""
+ * This file is part of the Sandy Andryanto Blog Application.
+ *
+ * @author     Sandy Andryanto <sandy.andryanto.blade@gmail.com>
+ * @copyright  2024
+ *
+ * For the full copyright and license information,
+ * please view the LICENSE.md file that was distributed
+ * with this source code.
+
+ BoundedProcessPool after one of its workers is killed: the running task
+ fails, the pool respawns and no pending slot is leaked.
+"""
+
+import os
+import signal
+import time
+
+import pytest
+
+from concurrent.futures.process import BrokenProcessPool
+from src.password import PasswordHasher, verify_password
+
+def test_hash_after_worker_killed():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    try:
+        pid = hasher.pool.submit(os.getpid).result()
+        running = hasher.pool.submit(time.sleep, 30)
+        os.kill(pid, signal.SIGKILL)
+        with pytest.raises(BrokenProcessPool):
+            running.result(timeout=30)
+        # More hashes than max_pending, a leaked slot would answer 503
+        for _ in range(3):
+            assert verify_password("Secret#123", hasher.hash("Secret#123"))
+        assert hasher.pool.submit(os.getpid).result() != pid
+    finally:
+        hasher.close()